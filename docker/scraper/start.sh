@@ -1,14 +1,17 @@
 #!/bin/bash
 
-# Start Xvfb silently
-Xvfb :99 -screen 0 1920x1080x16 > /dev/null 2>&1 &
-export DISPLAY=:99
+# The lean browser profile is truly headless and needs no display
+if [ "$BROWSER_PROFILE" != "lean" ]; then
+  # Start Xvfb silently
+  Xvfb :99 -screen 0 1920x1080x16 > /dev/null 2>&1 &
+  export DISPLAY=:99
 
-# Start window manager silently
-fluxbox > /dev/null 2>&1 &
+  # Start window manager silently
+  fluxbox > /dev/null 2>&1 &
 
-# Start VNC server silently
-x11vnc -display :99 -forever -nopw > /dev/null 2>&1 &
+  # Start VNC server silently
+  x11vnc -display :99 -forever -nopw > /dev/null 2>&1 &
+fi
 
 # Wait for PostgreSQL to be ready
 echo "Waiting for PostgreSQL..."
@@ -1 +1 @@
-ALTER TABLE runs ADD COLUMN next_run_at TIMESTAMP; 
\ No newline at end of file
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS next_run_at TIMESTAMP; 
\ No newline at end of file
@@ -1,4 +1,4 @@
-CREATE TABLE property_preferences (
+CREATE TABLE IF NOT EXISTS property_preferences (
     id SERIAL PRIMARY KEY,
     property_url TEXT NOT NULL,
     status VARCHAR(10) NOT NULL CHECK (status IN ('liked', 'disliked')),
@@ -7,4 +7,4 @@ CREATE TABLE property_preferences (
 );
 
 -- Add index for faster lookups
-CREATE INDEX idx_property_preferences_url ON property_preferences(property_url); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_property_preferences_url ON property_preferences(property_url); 
\ No newline at end of file
@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS uf_rates (
+    date DATE PRIMARY KEY,
+    value FLOAT NOT NULL,
+    fetched_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
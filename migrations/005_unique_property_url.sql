@@ -0,0 +1,21 @@
+-- Applied in a single transaction by web.migrate
+
+-- Remove duplicate listings, keeping the first row saved for each URL
+DELETE FROM property_images
+WHERE property_id IN (
+    SELECT p.id FROM properties p
+    JOIN properties o ON o.original_url = p.original_url AND o.id < p.id
+);
+
+DELETE FROM metro_stations
+WHERE property_id IN (
+    SELECT p.id FROM properties p
+    JOIN properties o ON o.original_url = p.original_url AND o.id < p.id
+);
+
+DELETE FROM properties p
+USING properties o
+WHERE o.original_url = p.original_url AND o.id < p.id;
+
+-- Same name Postgres gives the constraint created from the model's unique=True
+CREATE UNIQUE INDEX IF NOT EXISTS properties_original_url_key ON properties(original_url);
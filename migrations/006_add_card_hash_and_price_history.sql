@@ -0,0 +1,10 @@
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS card_hash BIGINT;
+
+CREATE TABLE IF NOT EXISTS property_price_history (
+    id SERIAL PRIMARY KEY,
+    property_id INT NOT NULL REFERENCES properties(id),
+    run_id INT REFERENCES runs(id),
+    price INT,
+    currency VARCHAR(5),
+    recorded_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
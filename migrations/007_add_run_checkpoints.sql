@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS run_checkpoints (
+    run_id INT PRIMARY KEY REFERENCES runs(id),
+    location_index INT NOT NULL DEFAULT 0,
+    page INT NOT NULL DEFAULT 0,
+    pending JSON,
+    saved INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,15 @@
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+
+-- Backfill from the Google Maps links saved before coordinates were stored directly
+UPDATE properties
+SET latitude = split_part(substring(google_maps_link from 'll=(-?[0-9.]+,-?[0-9.]+)'), ',', 1)::DOUBLE PRECISION,
+    longitude = split_part(substring(google_maps_link from 'll=(-?[0-9.]+,-?[0-9.]+)'), ',', 2)::DOUBLE PRECISION
+WHERE latitude IS NULL
+  AND google_maps_link ~ 'll=-?[0-9.]+,-?[0-9.]+';
+
+UPDATE properties
+SET latitude = split_part(substring(google_maps_link from '@(-?[0-9.]+,-?[0-9.]+)'), ',', 1)::DOUBLE PRECISION,
+    longitude = split_part(substring(google_maps_link from '@(-?[0-9.]+,-?[0-9.]+)'), ',', 2)::DOUBLE PRECISION
+WHERE latitude IS NULL
+  AND google_maps_link ~ '@-?[0-9.]+,-?[0-9.]+';
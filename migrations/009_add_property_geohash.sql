@@ -0,0 +1,6 @@
+ALTER TABLE properties ADD COLUMN IF NOT EXISTS geohash VARCHAR(12);
+
+-- text_pattern_ops lets prefix LIKE queries use the index regardless of collation
+CREATE INDEX IF NOT EXISTS ix_properties_geohash ON properties (geohash text_pattern_ops);
+
+-- Existing rows are geohashed by `python -m web.init_db`
@@ -0,0 +1,9 @@
+-- Child rows are always loaded by their property
+CREATE INDEX IF NOT EXISTS ix_property_images_property_id ON property_images (property_id);
+CREATE INDEX IF NOT EXISTS ix_metro_stations_property_id ON metro_stations (property_id);
+CREATE INDEX IF NOT EXISTS ix_property_price_history_property_id ON property_price_history (property_id);
+
+-- List pages walk runs newest first and each run's properties by id:
+-- ORDER BY runs.started_at DESC, properties.id DESC
+CREATE INDEX IF NOT EXISTS ix_runs_started_at ON runs (started_at);
+CREATE INDEX IF NOT EXISTS ix_properties_run_id_id ON properties (run_id, id);
@@ -0,0 +1,289 @@
+import atexit
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from scraper.config import (
+    BROWSER_POOL_SIZE,
+    MAX_PAGES_PER_BROWSER,
+    CHROMIUM_BINARY,
+    BROWSER_PROFILE,
+    BROWSER_DATA_DIR,
+    BROWSER_DATA_MAX_AGE,
+    LEAN_BLOCKED_URLS
+)
+from scraper.utils import log_and_print
+
+
+def get_random_user_agent():
+    """Generate a random Chrome-based user agent"""
+    chrome_versions = [
+        '90.0.4430.212',
+        '91.0.4472.124',
+        '92.0.4515.159',
+        '93.0.4577.82',
+        '94.0.4606.81',
+        '95.0.4638.69',
+        '96.0.4664.45',
+        '97.0.4692.71',
+        '98.0.4758.102',
+        '99.0.4844.51'
+    ]
+
+    os_versions = [
+        'Windows NT 10.0; Win64; x64',
+        'Windows NT 10.0; WOW64',
+        'Macintosh; Intel Mac OS X 10_15_7',
+        'X11; Linux x86_64',
+        'X11; Ubuntu; Linux x86_64'
+    ]
+
+    chrome_version = random.choice(chrome_versions)
+    os_version = random.choice(os_versions)
+
+    return f'Mozilla/5.0 ({os_version}) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{chrome_version} Safari/537.36'
+
+def prepare_data_dir(base_dir, slot, max_age=BROWSER_DATA_MAX_AGE):
+    """Return the persistent profile directory and user agent for a pool slot.
+
+    The directory is wiped and started fresh once it is older than
+    ``max_age`` seconds. Its user agent is kept alongside it so cookies
+    always come back with the browser identity that earned them.
+    """
+    data_dir = os.path.join(base_dir, f"browser-{slot}")
+    created_marker = os.path.join(data_dir, '.created')
+    user_agent_file = os.path.join(data_dir, '.user-agent')
+
+    if os.path.exists(created_marker) and time.time() - os.path.getmtime(created_marker) > max_age:
+        log_and_print(f"Rotating browser profile {data_dir}")
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    os.makedirs(data_dir, exist_ok=True)
+    if not os.path.exists(created_marker):
+        open(created_marker, 'w').close()
+
+    # Only one pooled browser uses a slot at a time, so locks left by a killed browser are stale
+    for name in ('SingletonLock', 'SingletonSocket', 'SingletonCookie'):
+        try:
+            os.unlink(os.path.join(data_dir, name))
+        except FileNotFoundError:
+            pass
+
+    if os.path.exists(user_agent_file):
+        with open(user_agent_file) as f:
+            user_agent = f.read().strip()
+    else:
+        user_agent = get_random_user_agent()
+        with open(user_agent_file, 'w') as f:
+            f.write(user_agent)
+
+    return data_dir, user_agent
+
+def create_driver(profile=BROWSER_PROFILE, data_dir=None, user_agent=None):
+    """Start a new Chromium driver with the scraper's standard options.
+
+    Passing ``data_dir`` keeps cookies and the disk cache there instead of
+    in a throwaway profile. The 'lean' profile runs truly headless, returns
+    from page loads at DOMContentLoaded and blocks images, media, fonts and
+    trackers.
+    """
+    lean = profile == 'lean'
+
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-software-rasterizer")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument(f"--user-agent={user_agent or get_random_user_agent()}")
+    if data_dir:
+        chrome_options.add_argument(f"--user-data-dir={data_dir}")
+    if lean:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.page_load_strategy = 'eager'
+    chrome_options.binary_location = CHROMIUM_BINARY
+
+    driver = webdriver.Chrome(options=chrome_options)
+    if lean:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+        except Exception:
+            quit_driver(driver)
+            raise
+    return driver
+
+def is_page_ready(driver):
+    """True once the page has loaded as far as the configured profile waits for"""
+    ready_state = driver.execute_script('return document.readyState')
+    if BROWSER_PROFILE == 'lean':
+        # Eager loading doesn't wait for subresources, most of which are blocked anyway
+        return ready_state in ('interactive', 'complete')
+    return ready_state == 'complete'
+
+def reset_driver_state(driver, keep_session=False):
+    """Clear cookies and storage so the next user starts from a clean browser"""
+    if not keep_session:
+        driver.delete_all_cookies()
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    driver.get("about:blank")
+
+def quit_driver(driver):
+    """Quit a driver, ignoring errors from an already dead browser"""
+    try:
+        driver.quit()
+    except Exception as e:
+        log_and_print(f"Error quitting browser: {e}", level='warning')
+
+
+class BrowserPool:
+    """Thread-safe pool of reusable Chromium drivers.
+
+    Drivers are started lazily up to ``size``, handed out with ``acquire``
+    and returned with ``release``. A driver is recycled once it has loaded
+    ``max_pages`` pages, or discarded when it fails its state reset.
+
+    With a ``data_dir`` each pool slot keeps a persistent profile there, so
+    cookies and cached static assets survive across listings and browser
+    restarts until the profile is rotated.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=MAX_PAGES_PER_BROWSER, data_dir=BROWSER_DATA_DIR):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.data_dir = data_dir
+        self._idle = queue.LifoQueue()
+        self._page_counts = {}
+        self._free_slots = list(range(self.size))
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def acquire(self):
+        """Check out a driver, starting a new one if the pool has room"""
+        while True:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                # A removed driver's slot is only freed once its browser has quit
+                can_create = len(self._page_counts) < self.size and bool(self._free_slots)
+                if can_create:
+                    # Reserve the slot before the (slow) browser startup
+                    placeholder = object()
+                    self._page_counts[placeholder] = 0
+                    slot = self._free_slots.pop()
+
+            if can_create:
+                break
+
+            # Wake up periodically in case a discarded driver freed a slot
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        try:
+            if self.data_dir:
+                data_dir, user_agent = prepare_data_dir(self.data_dir, slot)
+                driver = create_driver(data_dir=data_dir, user_agent=user_agent)
+            else:
+                driver = create_driver()
+        except BaseException:
+            with self._lock:
+                self._free_slots.append(slot)
+            raise
+        finally:
+            with self._lock:
+                del self._page_counts[placeholder]
+        with self._lock:
+            self._page_counts[driver] = 0
+            self._slots[driver] = slot
+        log_and_print(f"Started browser ({len(self._page_counts)}/{self.size} in pool)")
+        return driver
+
+    def release(self, driver, discard=False):
+        """Return a driver to the pool, recycling it if it is worn out or broken"""
+        with self._lock:
+            pages = self._page_counts.get(driver, 0)
+
+        if not discard and not self._closed and pages < self.max_pages:
+            try:
+                reset_driver_state(driver, keep_session=self.persistent)
+                self._idle.put(driver)
+                return
+            except Exception as e:
+                log_and_print(f"Browser failed state reset, discarding it: {e}", level='warning')
+        elif pages >= self.max_pages:
+            log_and_print(f"Recycling browser after {pages} pages")
+
+        self._remove(driver)
+
+    def worn_out(self, driver):
+        """True once a driver has used up its page budget and should be released"""
+        with self._lock:
+            return self._page_counts.get(driver, 0) >= self.max_pages
+
+    @property
+    def persistent(self):
+        """True if drivers keep their cookies and cache between pages"""
+        return bool(self.data_dir)
+
+    def navigate(self, driver, url):
+        """Load a URL and count it against the driver's page budget"""
+        driver.get(url)
+        with self._lock:
+            if driver in self._page_counts:
+                self._page_counts[driver] += 1
+
+    @contextmanager
+    def driver(self):
+        """Context manager that checks a driver out and always returns it"""
+        driver = self.acquire()
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """Quit every pooled browser"""
+        self._closed = True
+        atexit.unregister(self.close)
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._remove(driver)
+
+    def _remove(self, driver):
+        with self._lock:
+            self._page_counts.pop(driver, None)
+            slot = self._slots.pop(driver, None)
+        quit_driver(driver)
+        # Free the slot only once the browser has let go of its profile directory
+        if slot is not None:
+            with self._lock:
+                self._free_slots.append(slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
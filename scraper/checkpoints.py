@@ -0,0 +1,140 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+
+from scraper.database import Session, safe_commit
+from scraper.utils import log_and_print
+from web.models import Run, RunCheckpoint
+
+
+class RunCheckpointer:
+    """Tracks a run's progress and persists it so a restarted scraper can resume.
+
+    The checkpoint records the next search page to fetch and every listing
+    that was scheduled for detail extraction but hasn't been saved yet.
+    """
+
+    def __init__(self, run_id, location_index=0, page=0, pending=(), saved=0):
+        self.run_id = run_id
+        self.location_index = location_index
+        self.page = page
+        self.saved = saved
+        self._pending = {data["link"]: data for data in pending}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, run_id):
+        """Restore a run's checkpoint, or start a fresh one if it has none"""
+        session = Session()
+        try:
+            checkpoint = session.get(RunCheckpoint, run_id)
+            if checkpoint is None:
+                return cls(run_id)
+            return cls(
+                run_id,
+                location_index=checkpoint.location_index,
+                page=checkpoint.page,
+                pending=checkpoint.pending or [],
+                saved=checkpoint.saved or 0
+            )
+        finally:
+            session.close()
+
+    def pending(self):
+        """Listings scheduled before the restart that still need to be extracted"""
+        with self._lock:
+            return list(self._pending.values())
+
+    def mark_pending(self, data):
+        with self._lock:
+            self._pending[data["link"]] = data
+
+    def mark_done(self, url):
+        """Forget a listing that won't be saved (e.g. extraction failed)"""
+        with self._lock:
+            self._pending.pop(url, None)
+
+    def mark_saved(self, urls):
+        with self._lock:
+            for url in urls:
+                self._pending.pop(url, None)
+            self.saved += len(urls)
+
+    def save(self, location_index, page):
+        """Persist the next search page to fetch along with the pending listings"""
+        with self._lock:
+            self.location_index = location_index
+            self.page = page
+            values = {
+                'run_id': self.run_id,
+                'location_index': location_index,
+                'page': page,
+                'pending': list(self._pending.values()),
+                'saved': self.saved,
+                'updated_at': datetime.utcnow()
+            }
+
+        session = Session()
+        try:
+            stmt = insert(RunCheckpoint).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[RunCheckpoint.run_id],
+                set_={column: stmt.excluded[column] for column in values if column != 'run_id'}
+            )
+            session.execute(stmt)
+            safe_commit(session)
+        except Exception as e:
+            session.rollback()
+            log_and_print(f"Error saving checkpoint: {str(e)}", level='warning')
+        finally:
+            session.close()
+
+    def clear(self):
+        """Drop the checkpoint once the run has finished"""
+        session = Session()
+        try:
+            session.query(RunCheckpoint).filter(RunCheckpoint.run_id == self.run_id).delete()
+            safe_commit(session)
+        except Exception as e:
+            session.rollback()
+            log_and_print(f"Error clearing checkpoint: {str(e)}", level='warning')
+        finally:
+            session.close()
+
+
+def recover_interrupted_runs():
+    """Find the run to resume after a restart and mark any other unfinished runs as orphaned.
+
+    Returns the id of the most recent 'running' run that has a checkpoint, or None.
+    """
+    session = Session()
+    try:
+        interrupted = (
+            session.query(Run)
+            .filter(Run.status == 'running')
+            .order_by(Run.started_at.desc())
+            .all()
+        )
+        resume = next(
+            (run for run in interrupted if session.get(RunCheckpoint, run.id) is not None),
+            None
+        )
+
+        for run in interrupted:
+            if run is resume:
+                continue
+            run.status = 'orphaned'
+            run.completed_at = datetime.utcnow()
+            run.error_message = 'Scraper restarted before the run finished'
+            session.query(RunCheckpoint).filter(RunCheckpoint.run_id == run.id).delete()
+            log_and_print(f"Marked run {run.id} as orphaned", level='warning')
+
+        safe_commit(session)
+
+        if resume is not None:
+            log_and_print(f"Resuming interrupted run {resume.id}")
+            return resume.id
+        return None
+    finally:
+        session.close()
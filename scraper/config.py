@@ -15,11 +15,61 @@ MIN_PRICE_CLP = 0
 MAX_PRICE_CLP = 1200000
 MIN_BEDROOMS = 2
 
+# Incremental mode sorts results newest-first and stops paging a location once
+# this many consecutive pages contain only listings we already have
+INCREMENTAL_MODE = os.getenv('INCREMENTAL_MODE', 'false').lower() == 'true'
+INCREMENTAL_STOP_PAGES = int(os.getenv('INCREMENTAL_STOP_PAGES', 2))
+NEWEST_FIRST_ORDER = os.getenv('NEWEST_FIRST_ORDER', 'BEGINS*DESC')  # OrderId value for "Más recientes"
+
 # Base URL template
-def get_url_for_location(location, offset=0):
-    """Get URL for location with offset"""
+def get_url_for_location(location, offset=0, newest_first=False):
+    """Get URL for location with offset, optionally sorted newest-first"""
     base_url = 'https://www.portalinmobiliario.com/arriendo/departamento'
-    return f'{base_url}/{location}/_Desde_{offset + 1}_PriceRange_{MIN_PRICE_CLP}CLP-{MAX_PRICE_CLP}CLP_BEDROOMS_{MIN_BEDROOMS}-*_NoIndex_True'
+    order = f'_OrderId_{NEWEST_FIRST_ORDER}' if newest_first else ''
+    return f'{base_url}/{location}/_Desde_{offset + 1}{order}_PriceRange_{MIN_PRICE_CLP}CLP-{MAX_PRICE_CLP}CLP_BEDROOMS_{MIN_BEDROOMS}-*_NoIndex_True'
 
 # Example URL Format
 # https://www.portalinmobiliario.com/arriendo/departamento/propiedades-usadas/providencia-metropolitana/_Desde_0_PriceRange_0CLP-1200000CLP_BEDROOMS_2-*_NoIndex_True
+
+# Browser settings
+CHROMIUM_BINARY = os.getenv('CHROMIUM_BINARY', '/usr/bin/chromium')
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 1))
+MAX_PAGES_PER_BROWSER = int(os.getenv('MAX_PAGES_PER_BROWSER', 50))  # Restart a browser after this many page loads
+BROWSER_PROFILE = os.getenv('BROWSER_PROFILE', 'full')  # 'full' (headed, under Xvfb) or 'lean' (headless, no images/fonts/trackers)
+BROWSER_DATA_DIR = os.getenv('BROWSER_DATA_DIR', '')  # Keep a persistent user-data-dir (cookies, disk cache) per pooled browser here; empty for throwaway profiles
+BROWSER_DATA_MAX_AGE = int(os.getenv('BROWSER_DATA_MAX_AGE', 86400))  # Seconds before a persistent profile is wiped and started fresh
+
+# URL patterns the lean profile blocks via CDP (images, media, fonts and third-party trackers)
+LEAN_BLOCKED_URLS = [
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.mp4', '*.webm', '*.mp3',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*facebook.net*', '*hotjar.com*', '*clarity.ms*',
+]
+
+# Concurrency settings
+DETAIL_WORKERS = int(os.getenv('DETAIL_WORKERS', 1))  # Parallel detail-page workers, each with its own browser
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 100))  # Max listings waiting between pipeline stages
+
+# Adaptive throttle settings (rates are requests per second across all workers)
+THROTTLE_START_RATE = float(os.getenv('THROTTLE_START_RATE', 0.5))
+THROTTLE_MIN_RATE = float(os.getenv('THROTTLE_MIN_RATE', 1 / 60))
+THROTTLE_MAX_RATE = float(os.getenv('THROTTLE_MAX_RATE', 2))
+THROTTLE_BACKOFF = float(os.getenv('THROTTLE_BACKOFF', 0.5))  # Rate multiplier after a timeout or block page
+THROTTLE_RECOVERY = float(os.getenv('THROTTLE_RECOVERY', 0.05))  # Rate added after each successful request
+THROTTLE_BLOCK_PAUSE = float(os.getenv('THROTTLE_BLOCK_PAUSE', 60))  # Seconds every fetcher pauses after a block page
+
+# Fetch settings
+DETAIL_FETCH_MODE = os.getenv('DETAIL_FETCH_MODE', 'auto')  # 'http', 'browser' or 'auto' (http with browser fallback)
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 15))
+SEARCH_FETCH_MODE = os.getenv('SEARCH_FETCH_MODE', 'auto')  # Same choices as DETAIL_FETCH_MODE, for result pages
+MAX_PAGE_FAILURES = int(os.getenv('MAX_PAGE_FAILURES', 5))  # Failed fetches of one search page before its location is skipped
+
+# UF exchange rate settings
+UF_API_URL = os.getenv('UF_API_URL', 'https://mindicador.cl/api')
+UF_CACHE_TTL = int(os.getenv('UF_CACHE_TTL', 3600))  # Seconds a looked-up UF value is reused in-process
+UF_FAILURE_TTL = int(os.getenv('UF_FAILURE_TTL', 60))  # Seconds before a failed UF lookup is retried
+
+# Database settings
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', 25))  # Properties buffered per multi-row write
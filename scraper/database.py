@@ -1,12 +1,16 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, delete, update, bindparam
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.exc import OperationalError, SQLAlchemyError, IntegrityError, DataError
 import os
+import threading
 from datetime import datetime
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 from scraper.utils import log_and_print
+from scraper.config import WRITE_BATCH_SIZE
 
-from web.models import Run, Property, PropertyImage, MetroStation
+from web.models import Run, Property, PropertyImage, MetroStation, PropertyPriceHistory
+from web.geo import geohash_encode
 
 # Create database engine with updated connection pool settings
 engine = create_engine(
@@ -26,7 +30,7 @@ SessionFactory = sessionmaker(bind=engine)
 Session = scoped_session(SessionFactory)
 
 # Export Session for use in other modules
-__all__ = ['Session', 'get_db_session', 'save_property', 'save_single_property', 'is_duplicate_listing']
+__all__ = ['Session', 'get_db_session', 'save_property', 'save_single_property', 'is_duplicate_listing', 'PropertyWriter']
 
 @retry(
     stop=stop_after_attempt(5),
@@ -94,55 +98,141 @@ def is_duplicate_listing(session, url):
         log_and_print(f"Skipping duplicate listing: {url}", level='info')
     return is_duplicate
 
-def save_property(prop_data, run_id):
-    """Save a single property to database"""
+def _geohash(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return geohash_encode(latitude, longitude)
+
+def _property_values(prop_data, run_id):
+    """Column values for a properties row built from scraped data"""
+    return {
+        'run_id': run_id,
+        'location': prop_data.get('location', ''),
+        'title': prop_data.get('title', ''),
+        'price': prop_data.get('price', 0),
+        'common_costs': prop_data.get('common_costs'),
+        'total_price': prop_data.get('total_price'),
+        'total_area': clean_area(prop_data.get('total_area')),
+        'floor': prop_data.get('floor'),
+        'total_floors': prop_data.get('total_floors'),
+        'furnished': prop_data.get('furnished'),
+        'has_gym': prop_data.get('has_gym'),
+        'original_url': prop_data.get('link', ''),
+        'latitude': prop_data.get('latitude'),
+        'longitude': prop_data.get('longitude'),
+        'geohash': _geohash(prop_data.get('latitude'), prop_data.get('longitude')),
+        'card_hash': prop_data.get('card_hash')
+    }
+
+# Columns refreshed when a listing we already have is scraped again.
+# run_id and created_at keep pointing at the run that first found it.
+UPSERT_COLUMNS = [
+    'location',
+    'title',
+    'price',
+    'common_costs',
+    'total_price',
+    'total_area',
+    'floor',
+    'total_floors',
+    'furnished',
+    'has_gym',
+    'latitude',
+    'longitude',
+    'geohash',
+    'card_hash'
+]
+
+def _replace_child_rows(session, property_ids, records):
+    """Replace the images and metro stations of saved properties.
+
+    ``property_ids`` maps each record's URL to its property id. Old child rows
+    are removed with one DELETE per table and the new ones are written with
+    executemany inserts.
+    """
+    # Sorted so concurrent writers lock child rows in the same order
+    ids = sorted(property_ids.values())
+    session.execute(delete(PropertyImage).where(PropertyImage.property_id.in_(ids)))
+    session.execute(delete(MetroStation).where(MetroStation.property_id.in_(ids)))
+
+    images = []
+    stations = []
+    for prop_data in records:
+        property_id = property_ids[prop_data.get('link', '')]
+        images.extend(
+            {'property_id': property_id, 'image_url': image_url}
+            for image_url in prop_data.get('images', [])
+        )
+        metro_stations = prop_data.get('metro_station', []) or []
+        stations.extend(
+            {
+                'property_id': property_id,
+                'name': station_data['name'],
+                'walking_minutes': station_data['walking_minutes'],
+                'distance_meters': station_data['distance_meters']
+            }
+            for station_data in metro_stations
+        )
+
+    if images:
+        session.execute(insert(PropertyImage), images)
+    if stations:
+        session.execute(insert(MetroStation), stations)
+
+def _upsert_properties(session, records, run_id):
+    """Insert or update a batch of properties with one multi-row statement.
+
+    Returns a dict mapping each URL to its property id. Child rows are
+    replaced in the same transaction; the caller commits.
+    """
+    # A single INSERT ... ON CONFLICT can't touch the same row twice, and sorting by URL
+    # makes concurrent scrapers lock overlapping listings in the same order instead of deadlocking
+    records = sorted(
+        {prop_data.get('link', ''): prop_data for prop_data in records}.values(),
+        key=lambda prop_data: prop_data.get('link', '')
+    )
+
+    stmt = insert(Property).values([_property_values(prop_data, run_id) for prop_data in records])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Property.original_url],
+        set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+    ).returning(Property.id, Property.original_url)
+    property_ids = {url: property_id for property_id, url in session.execute(stmt)}
+
+    _replace_child_rows(session, property_ids, records)
+
+    # New listings get their first price point, changed ones a new one
+    session.execute(insert(PropertyPriceHistory), [
+        {
+            'property_id': property_ids[prop_data.get('link', '')],
+            'run_id': run_id,
+            'price': prop_data.get('price'),
+            'currency': prop_data.get('currency'),
+            'recorded_at': datetime.utcnow()
+        }
+        for prop_data in records
+    ])
+    return property_ids
+
+def save_property(prop_data, run_id, known_urls=None):
+    """Insert or update a property and its child rows in one transaction, returning its id.
+
+    Relies on the unique index on properties.original_url, so concurrent
+    scrapers saving the same listing can't create duplicates.
+    """
     if not prop_data:
         log_and_print("No property data to save", level='warning')
         return None
 
     session = Session()
     try:
-        # Create property
-        property = Property(
-            run_id=run_id,
-            location=prop_data.get('location', ''),
-            title=prop_data.get('title', ''),
-            price=prop_data.get('price', 0),
-            common_costs=prop_data.get('common_costs'),
-            total_price=prop_data.get('total_price'),
-            total_area=clean_area(prop_data.get('total_area')),
-            floor=prop_data.get('floor'),
-            total_floors=prop_data.get('total_floors'),
-            furnished=prop_data.get('furnished'),
-            has_gym=prop_data.get('has_gym'),
-            original_url=prop_data.get('link', ''),
-            google_maps_link=prop_data.get('google_maps_link')
-        )
-        session.add(property)
-        session.flush()  # Get property.id
-
-        # Add images
-        for image_url in prop_data.get('images', []):
-            image = PropertyImage(
-                property_id=property.id,
-                image_url=image_url
-            )
-            session.add(image)
-
-        # Add metro stations
-        metro_stations = prop_data.get('metro_station', []) or []
-        for station_data in metro_stations:
-            station = MetroStation(
-                property_id=property.id,
-                name=station_data['name'],
-                walking_minutes=station_data['walking_minutes'],
-                distance_meters=station_data['distance_meters']
-            )
-            session.add(station)
+        property_ids = _upsert_properties(session, [prop_data], run_id)
 
         safe_commit(session)
+        if known_urls is not None:
+            known_urls.add(prop_data.get('link', ''), prop_data.get('card_hash'))
         print(f"Successfully saved property: {prop_data.get('title')}")
-        return property
+        return property_ids[prop_data.get('link', '')]
 
     except Exception as e:
         session.rollback()
@@ -151,58 +241,160 @@ def save_property(prop_data, run_id):
     finally:
         session.close()
 
-def save_single_property(prop_data, run_id):
-    """Save a single property to database"""
+def backfill_card_hashes(card_hashes):
+    """Store card hashes for listings saved before hashes were tracked"""
+    if not card_hashes:
+        return
+
     session = Session()
     try:
-        # Check if listing already exists
-        if is_duplicate_listing(session, prop_data.get('link', '')):
+        # Core (not ORM) update, since ORM bulk updates only match on primary key
+        properties = Property.__table__
+        session.execute(
+            update(properties)
+            .where(properties.c.original_url == bindparam('url'), properties.c.card_hash.is_(None))
+            .values(card_hash=bindparam('new_hash')),
+            [{'url': url, 'new_hash': new_hash} for url, new_hash in card_hashes]
+        )
+        safe_commit(session)
+        log_and_print(f"Backfilled card hashes for {len(card_hashes)} listings")
+    except Exception as e:
+        session.rollback()
+        log_and_print(f"Error backfilling card hashes: {str(e)}", level='error')
+    finally:
+        session.close()
+
+
+class PropertyWriter:
+    """Buffer scraped properties and write them to the database in batches.
+
+    Every ``batch_size`` records are saved with multi-row inserts in a single
+    transaction. Use it as a context manager so whatever is still buffered is
+    flushed on shutdown, including when the run fails.
+    """
+
+    def __init__(self, run_id, batch_size=WRITE_BATCH_SIZE, known_urls=None, on_flush=None, on_drop=None):
+        self.run_id = run_id
+        self.batch_size = max(1, batch_size)
+        self.known_urls = known_urls
+        self.on_flush = on_flush  # Called with the URLs of each committed batch
+        self.on_drop = on_drop  # Called with the URL of each record that won't be saved
+        self.written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def add(self, prop_data):
+        """Queue a property, flushing once the batch is full"""
+        if not prop_data:
+            log_and_print("No property data to save", level='warning')
+            return
+        if prop_data.get('price') is None:
+            # properties.price is NOT NULL; this happens for unknown currencies or a missing UF rate
+            log_and_print(f"Skipping property without a price: {prop_data.get('link', '')}", level='warning')
+            self._dropped(prop_data)
+            return
+
+        with self._lock:
+            self._buffer.append(prop_data)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """Write everything buffered so far"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        try:
+            property_ids = self._write(batch)
+        except (IntegrityError, DataError) as e:
+            # One bad record shouldn't cost the rest of the batch; retry row by row and drop only it
+            log_and_print(f"Batch of {len(batch)} properties rejected, retrying one at a time: {str(e)}", level='warning')
+            property_ids = {}
+            for prop_data in batch:
+                try:
+                    property_ids.update(self._write([prop_data]))
+                except (IntegrityError, DataError) as e:
+                    log_and_print(f"Dropping property {prop_data.get('link', '')}: {str(e)}", level='error')
+                    self._dropped(prop_data)
+
+        if self.known_urls is not None:
+            hashes = {prop_data.get('link', ''): prop_data.get('card_hash') for prop_data in batch}
+            for url in property_ids:
+                self.known_urls.add(url, hashes.get(url))
+        self.written += len(property_ids)
+        if self.on_flush is not None:
+            self.on_flush(list(property_ids))
+        log_and_print(f"Saved batch of {len(property_ids)} properties ({self.written} this run)")
+
+    def _dropped(self, prop_data):
+        if self.on_drop is not None:
+            self.on_drop(prop_data.get('link', ''))
+
+    @retry(
+        retry=retry_if_exception_type(OperationalError),
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        reraise=True
+    )
+    def _write(self, records):
+        """Upsert records in one transaction, returning {url: id}.
+
+        Commits directly rather than through safe_commit: a failed commit must
+        raise so the batch isn't reported as saved. Deadlocks and dropped
+        connections (OperationalError) rerun the whole transaction.
+        """
+        session = Session()
+        try:
+            property_ids = _upsert_properties(session, records, self.run_id)
+            session.commit()
+            return property_ids
+        except Exception as e:
+            session.rollback()
+            log_and_print(f"Error saving batch of {len(records)} properties: {str(e)}", level='error')
+            raise
+        finally:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+def save_single_property(prop_data, run_id, known_urls=None):
+    """Save a property unless it already exists, returning its id or None for duplicates"""
+    if known_urls is not None and prop_data.get('link', '') in known_urls:
+        log_and_print(f"Skipping duplicate property: {prop_data.get('title', 'Unknown')}", level='info')
+        return None
+
+    session = Session()
+    try:
+        stmt = (
+            insert(Property)
+            .values(**_property_values(prop_data, run_id))
+            .on_conflict_do_nothing(index_elements=[Property.original_url])
+            .returning(Property.id)
+        )
+        property_id = session.execute(stmt).scalar_one_or_none()
+        if property_id is None:
+            session.rollback()
             log_and_print(f"Skipping duplicate property: {prop_data.get('title', 'Unknown')}", level='info')
             return None
 
-        # Create property
-        property = Property(
-            run_id=run_id,
-            location=prop_data.get('location', ''),
-            title=prop_data.get('title', ''),
-            price=prop_data.get('price', 0),
-            common_costs=prop_data.get('common_costs'),
-            total_price=prop_data.get('total_price'),
-            total_area=clean_area(prop_data.get('total_area')),
-            floor=prop_data.get('floor'),
-            total_floors=prop_data.get('total_floors'),
-            furnished=prop_data.get('furnished'),
-            has_gym=prop_data.get('has_gym'),
-            original_url=prop_data.get('link', ''),
-            google_maps_link=prop_data.get('google_maps_link')
-        )
-        session.add(property)
-        session.flush()
-
-        # Add images
-        for image_url in prop_data.get('images', []):
-            image = PropertyImage(
-                property_id=property.id,
-                image_url=image_url
-            )
-            session.add(image)
-
-        # Add metro stations
-        metro_stations = prop_data.get('metro_station', []) or []
-        for station_data in metro_stations:
-            station = MetroStation(
-                property_id=property.id,
-                name=station_data['name'],
-                walking_minutes=station_data['walking_minutes'],
-                distance_meters=station_data['distance_meters']
-            )
-            session.add(station)
+        _replace_child_rows(session, {prop_data.get('link', ''): property_id}, [prop_data])
 
         safe_commit(session)
-        return property
+        if known_urls is not None:
+            known_urls.add(prop_data.get('link', ''), prop_data.get('card_hash'))
+        return property_id
 
     except Exception as e:
         session.rollback()
         raise
     finally:
-        session.close() 
\ No newline at end of file
+        session.close()
@@ -0,0 +1,85 @@
+import hashlib
+import threading
+
+from scraper.utils import log_and_print
+from web.models import Property
+
+
+def url_digest(url):
+    """Compact 64-bit fingerprint of a listing URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def card_hash(title, currency, amount):
+    """Signed 64-bit hash of the search-card fields we track for changes"""
+    content = '\x1f'.join(str(value or '') for value in (title, currency, amount))
+    return int.from_bytes(hashlib.blake2b(content.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+class KnownUrlIndex:
+    """In-memory index of listing URLs that are already stored or scheduled.
+
+    Loaded once per run so duplicate checks are dict lookups instead of a
+    query per listing. URLs are kept as 64-bit digests, which keeps the
+    index small for large histories at a negligible collision risk, mapped
+    to the card hash we last saw for the listing.
+    """
+
+    def __init__(self, urls=()):
+        self._hashes = {url_digest(url): None for url in urls}
+        self._backfill = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, session, batch_size=10000):
+        """Build the index from every URL (and card hash) already in the properties table"""
+        index = cls()
+        rows = session.query(Property.original_url, Property.card_hash).yield_per(batch_size)
+        index._hashes.update((url_digest(url), stored_hash) for url, stored_hash in rows)
+        log_and_print(f"Loaded {len(index)} known listing URLs")
+        return index
+
+    def __contains__(self, url):
+        return url_digest(url) in self._hashes
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, url, new_hash=None):
+        with self._lock:
+            self._hashes[url_digest(url)] = new_hash
+
+    def is_unchanged(self, url, new_hash=None):
+        """True if the URL is known and its card hasn't changed since we saved it"""
+        digest = url_digest(url)
+        with self._lock:
+            if digest not in self._hashes:
+                return False
+            stored_hash = self._hashes[digest]
+            return stored_hash is None or new_hash is None or stored_hash == new_hash
+
+    def claim(self, url, new_hash=None):
+        """Mark a URL as scheduled, returning False if it is known and unchanged.
+
+        Listings saved before card hashes existed have no stored hash; they are
+        treated as unchanged and their current hash is queued for backfill.
+        """
+        digest = url_digest(url)
+        with self._lock:
+            if digest in self._hashes:
+                stored_hash = self._hashes[digest]
+                if stored_hash is None and new_hash is not None:
+                    self._backfill[url] = new_hash
+                    self._hashes[digest] = new_hash
+                    return False
+                if stored_hash == new_hash or new_hash is None:
+                    return False
+                log_and_print(f"Listing changed since last run, refreshing: {url}")
+
+            self._hashes[digest] = new_hash
+            return True
+
+    def take_backfill(self):
+        """Return and clear the (url, card_hash) pairs waiting to be stored"""
+        with self._lock:
+            backfill, self._backfill = self._backfill, {}
+        return list(backfill.items())
@@ -0,0 +1,71 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scraper.config import DETAIL_WORKERS, HTTP_TIMEOUT
+from scraper.browser import get_random_user_agent
+from scraper.parsing import BLOCK_STATUS_CODES, GONE_STATUS_CODES, is_block_page_url
+from scraper.throttle import throttle
+from scraper.utils import log_and_print
+
+# Returned by fetch_html for pages that no longer exist, so callers neither retry nor fall back to a browser
+GONE = object()
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session():
+    """Return the process-wide HTTP session with a connection pool sized for our workers"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, DETAIL_WORKERS * 2))
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers.update({
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'es-CL,es;q=0.9,en;q=0.8',
+            })
+        return _session
+
+def fetch_html(url):
+    """Fetch a page over the pooled session, returning None on errors or block responses.
+
+    Waits for the shared throttle first and reports the outcome back to it.
+    Returns GONE for a 404 or 410, which isn't held against the throttle.
+    """
+    throttle.acquire()
+    try:
+        response = get_http_session().get(
+            url,
+            headers={'User-Agent': get_random_user_agent()},
+            timeout=HTTP_TIMEOUT
+        )
+    except requests.Timeout as e:
+        log_and_print(f"HTTP request timed out for {url}: {e}", level='warning')
+        throttle.record_timeout()
+        return None
+    except requests.RequestException as e:
+        log_and_print(f"HTTP request failed for {url}: {e}", level='warning')
+        throttle.record_error("connection error")
+        return None
+
+    if response.status_code in BLOCK_STATUS_CODES or is_block_page_url(response.url):
+        log_and_print(f"Blocked (HTTP {response.status_code}) fetching {url}", level='warning')
+        throttle.record_block()
+        return None
+
+    if response.status_code in GONE_STATUS_CODES:
+        log_and_print(f"HTTP {response.status_code} for {url}, page is gone", level='warning')
+        return GONE
+
+    if response.status_code != 200:
+        log_and_print(f"HTTP {response.status_code} for {url}", level='warning')
+        if response.status_code >= 500:
+            throttle.record_error(f"HTTP {response.status_code}")
+        return None
+
+    throttle.record_success()
+    return response.text
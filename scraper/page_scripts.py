@@ -0,0 +1,93 @@
+from scraper.parsing import (
+    DETAIL_IMAGE_SELECTOR,
+    SPEC_ROW_SELECTOR,
+    SPEC_HEADER_SELECTOR,
+    SPEC_VALUE_SELECTOR,
+    POI_TAB_SELECTOR,
+    POI_ITEM_SELECTOR,
+    POI_NAME_SELECTOR,
+    POI_DISTANCE_SELECTOR,
+    COMMON_COSTS_SELECTOR,
+    DESCRIPTION_SELECTOR,
+    ADDRESS_SELECTOR,
+    MAP_IMAGE_SELECTOR,
+    LOCATION_JSON_PATTERN,
+    SEARCH_ITEM_SELECTOR,
+    CARD_TITLE_SELECTOR,
+    CARD_PRICE_SELECTOR,
+    CARD_CURRENCY_SELECTOR,
+    CARD_AMOUNT_SELECTOR,
+    CARD_LINK_SELECTOR
+)
+
+# JavaScript snippets run through driver.execute_script. Each one collects
+# everything we need from the page in a single WebDriver round trip and
+# leaves the parsing to Python.
+
+# Returns [{title, currency, amount, link}, ...] for every card on a search page
+SEARCH_CARDS_SCRIPT = f"""
+const cards = [];
+document.querySelectorAll({SEARCH_ITEM_SELECTOR!r}).forEach((item) => {{
+    const title = item.querySelector({CARD_TITLE_SELECTOR!r});
+    const price = item.querySelector({CARD_PRICE_SELECTOR!r});
+    const link = item.querySelector({CARD_LINK_SELECTOR!r});
+    if (!title || !price || !link || !link.href) {{
+        return;
+    }}
+    const currency = price.querySelector({CARD_CURRENCY_SELECTOR!r});
+    const amount = price.querySelector({CARD_AMOUNT_SELECTOR!r});
+    cards.push({{
+        title: title.innerText.trim(),
+        currency: currency ? currency.innerText.trim() : null,
+        amount: amount ? amount.innerText.trim() : null,
+        link: link.href.split('#')[0].split('?')[0]
+    }});
+}});
+return cards;
+"""
+
+# Returns a detail-page snapshot in the shape parsing.apply_detail_snapshot expects.
+# Optional sections come back as null instead of waiting for them to appear.
+DETAIL_SNAPSHOT_SCRIPT = f"""
+const text = (el) => el ? el.innerText : null;
+const mapImage = document.querySelector({MAP_IMAGE_SELECTOR!r});
+const locationMatch = document.documentElement.innerHTML.match(new RegExp({LOCATION_JSON_PATTERN!r}));
+
+const snapshot = {{
+    images: Array.from(document.querySelectorAll({DETAIL_IMAGE_SELECTOR!r}))
+        .map((img) => img.getAttribute('data-src') || img.src),
+    spec_rows: [],
+    metro_stations: null,
+    common_costs: text(document.querySelector({COMMON_COSTS_SELECTOR!r})),
+    description: text(document.querySelector({DESCRIPTION_SELECTOR!r})),
+    address: text(document.querySelector({ADDRESS_SELECTOR + ' p'!r})),
+    map_src: mapImage ? (mapImage.getAttribute('src') || mapImage.getAttribute('data-src')) : null,
+    coordinates: locationMatch ? [locationMatch[1], locationMatch[2]] : null
+}};
+
+document.querySelectorAll({SPEC_ROW_SELECTOR!r}).forEach((row) => {{
+    const header = row.querySelector({SPEC_HEADER_SELECTOR!r});
+    const value = row.querySelector({SPEC_VALUE_SELECTOR!r});
+    if (header && value) {{
+        snapshot.spec_rows.push([header.innerHTML, value.innerHTML]);
+    }}
+}});
+
+for (const tab of document.querySelectorAll({POI_TAB_SELECTOR!r})) {{
+    const holder = Array.from(tab.querySelectorAll('*')).find((el) =>
+        Array.from(el.childNodes).some((node) => node.nodeType === Node.TEXT_NODE && node.nodeValue === 'Estaciones de metro')
+    );
+    if (!holder) {{
+        continue;
+    }}
+    snapshot.metro_stations = Array.from(holder.parentElement.querySelectorAll({POI_ITEM_SELECTOR!r}))
+        .map((station) => ({{
+            name: text(station.querySelector({POI_NAME_SELECTOR!r})),
+            distance: text(station.querySelector({POI_DISTANCE_SELECTOR!r}))
+        }}))
+        .filter((station) => station.name !== null && station.distance !== null);
+    break;
+}}
+
+return snapshot;
+"""
@@ -0,0 +1,294 @@
+import re
+
+from bs4 import BeautifulSoup
+
+from scraper.utils import log_and_print
+
+ORANGE = '\033[93m'
+RESET = '\033[0m'
+
+DETAIL_IMAGE_SELECTOR = ".ui-pdp-image.ui-pdp-gallery__figure__image"
+SPEC_ROW_SELECTOR = ".andes-table__row"
+SPEC_HEADER_SELECTOR = ".andes-table__header__container"
+SPEC_VALUE_SELECTOR = ".andes-table__column--value"
+POI_TAB_SELECTOR = ".andes-tab-content.ui-vip-poi__tab-content"
+POI_ITEM_SELECTOR = ".ui-vip-poi__item"
+POI_NAME_SELECTOR = ".ui-pdp-color--BLACK.ui-pdp-size--XSMALL.ui-pdp-family--REGULAR"
+POI_DISTANCE_SELECTOR = ".ui-pdp-color--GRAY.ui-pdp-size--XSMALL.ui-pdp-family--REGULAR"
+COMMON_COSTS_SELECTOR = ".ui-pdp-color--GRAY.ui-pdp-size--XSMALL.ui-pdp-family--REGULAR.ui-pdp-maintenance-fee-ltr"
+DESCRIPTION_SELECTOR = ".ui-pdp-description__content"
+ADDRESS_SELECTOR = ".ui-pdp-media.ui-vip-location__subtitle.ui-pdp-color--BLACK"
+MAP_IMAGE_SELECTOR = "#ui-vip-location__map > div > img"
+
+# The location section's static map is centred on the listing, and the page state embeds the same point
+MAP_CENTER_PATTERN = r"center=(-?\d+(?:\.\d+)?)(?:,|%2C)(-?\d+(?:\.\d+)?)"
+LOCATION_JSON_PATTERN = r'"latitude"\s*:\s*(-?\d+(?:\.\d+)?)\s*,\s*"longitude"\s*:\s*(-?\d+(?:\.\d+)?)'
+
+SEARCH_CONTAINER_SELECTOR = "ol.ui-search-layout"
+SEARCH_ITEM_SELECTOR = "li.ui-search-layout__item"
+CARD_TITLE_SELECTOR = ".poly-component__headline"
+CARD_PRICE_SELECTOR = ".andes-money-amount"
+CARD_CURRENCY_SELECTOR = ".andes-money-amount__currency-symbol"
+CARD_AMOUNT_SELECTOR = ".andes-money-amount__fraction"
+CARD_LINK_SELECTOR = "div.poly-card__content > h2 > a"
+NO_RESULTS_SELECTOR = ".ui-search-rescue__title"
+NO_RESULTS_TEXT = "no hay inmuebles que coincidan con tu búsqueda"
+
+# Where the site redirects clients it thinks are bots, and the statuses it answers them with
+BLOCK_PAGE_URL_MARKERS = ("account-verification", "/captcha")
+BLOCK_STATUS_CODES = (403, 429)
+GONE_STATUS_CODES = (404, 410)  # Listing removed; not a sign of rate limiting
+
+def is_block_page_url(url):
+    """True if we were redirected to a verification or captcha page"""
+    return any(marker in (url or '') for marker in BLOCK_PAGE_URL_MARKERS)
+
+def new_listing_details():
+    """Return a details dict with every field initialised to its empty value"""
+    return {
+        'images': [],
+        'full_address': None,
+        'latitude': None,
+        'longitude': None,
+        'metro_station': None,
+        'common_costs': None,
+        'has_gym': False,
+        'floor': None,
+        'total_floors': None,
+        'furnished': None,
+        'total_area': None,
+        'apartment_type': None,
+        'total_price': None,
+        'description': None
+    }
+
+def apply_spec_row(details, header, value):
+    """Map a specifications table row onto the details dict"""
+    mapping = {
+        'Superficie total': ('total_area', value.replace("m²", "")),
+        'Número de piso de la unidad': ('floor', value),
+        'Cantidad de pisos': ('total_floors', value),
+        'Tipo de departamento': ('apartment_type', value),
+        'Amoblado': ('furnished', value == 'Sí'),
+        'Gimnasio': ('has_gym', value == 'Sí'),
+        'Dormitorios': ('bedrooms', value),
+        'Baños': ('bathrooms', value),
+        'Estacionamientos': ('parking_spots', value),
+        'Bodegas': ('storage_units', value),
+    }
+
+    if header in mapping:
+        key, val = mapping[header]
+        if val is None or val == "":
+            log_and_print(f"{ORANGE}Warning: Skipping empty value for {key}{RESET}", level='warning')
+        details[key] = val
+
+def parse_metro_distance(distance_text):
+    """Parse Spanish format: "10 mins - 751 metros" or "12 mins - 1.523 metros" """
+    parts = distance_text.split(' - ')  # Split by the dash
+    walking_minutes = parts[0].split(' ')[0]  # Get "10" from "10 mins"
+    distance_meters = parts[1].split(' ')[0].replace('.', '')  # Get "1523" from "1.523"
+    return walking_minutes, distance_meters
+
+def parse_common_costs(common_costs_text):
+    """Convert the common costs label into an integer CLP amount"""
+    common_costs_text = common_costs_text.strip()
+    common_costs_text = common_costs_text.replace("Gastos comunes aproximados $", "")
+    common_costs_text = common_costs_text.replace("Gastos comunes desde $", "")
+    common_costs_text = common_costs_text.replace(".", "")
+    common_costs_text = common_costs_text.replace(",", ".")
+    common_costs_text = common_costs_text.strip()
+    return int(common_costs_text)
+
+def valid_coordinates(latitude, longitude):
+    """Return (latitude, longitude) as floats, or None when they are missing or out of range"""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or (latitude == 0 and longitude == 0):
+        return None
+    return latitude, longitude
+
+def parse_coordinates(text, pattern):
+    """Return the (latitude, longitude) matched by ``pattern`` in ``text``, or None"""
+    match = re.search(pattern, text or '')
+    if match is None:
+        return None
+    return valid_coordinates(match.group(1), match.group(2))
+
+def finalize_details(details, price):
+    """Fill in the total price and warn about fields that are still missing"""
+    if price is not None:
+        details['total_price'] = price + (details['common_costs'] if details['common_costs'] is not None else 0)
+    else:
+        details['total_price'] = None
+
+    missing_fields = [k for k, v in details.items() if v is None]
+    if missing_fields:
+        log_and_print(f"Warning: Missing fields in final details: {', '.join(missing_fields)}",
+                      level='warning',
+                      color=ORANGE)
+
+    return details
+
+def apply_detail_snapshot(details, snapshot):
+    """Fill the details dict from a detail-page snapshot.
+
+    A snapshot is a plain dict with the raw values of every section we read:
+    ``images``, ``spec_rows`` ([header, value] pairs), ``metro_stations``
+    ([{name, distance}] or None when the section is absent), ``common_costs``,
+    ``description``, ``address``, ``map_src`` (the static map image URL) and
+    ``coordinates`` ([lat, lng] from the page state, or None). Both the
+    browser snapshot script and the HTML parser produce this shape.
+    """
+    details['images'] = [src for src in snapshot.get('images') or [] if src and not src.startswith('data:')]
+
+    for header, value in snapshot.get('spec_rows') or []:
+        try:
+            apply_spec_row(details, header, value)
+        except Exception as e:
+            log_and_print(f"{ORANGE}Warning: Error processing row: {str(e)}{RESET}", level='warning')
+
+    metro_stations = snapshot.get('metro_stations')
+    if metro_stations is None:
+        log_and_print("No metro stations found.")
+    else:
+        all_metro_stations = []
+        for station in metro_stations:
+            try:
+                walking_minutes, distance_meters = parse_metro_distance(station['distance'])
+            except (IndexError, KeyError, AttributeError) as e:
+                log_and_print(f"{ORANGE}Warning: Error parsing metro station: {str(e)}{RESET}", level='warning')
+                continue
+            all_metro_stations.append({
+                'name': station['name'],
+                'walking_minutes': walking_minutes,
+                'distance_meters': distance_meters
+            })
+        details['metro_station'] = all_metro_stations
+        log_and_print(f"Found metro station {details['metro_station']}")
+
+    if snapshot.get('common_costs'):
+        try:
+            details['common_costs'] = parse_common_costs(snapshot['common_costs'])
+        except ValueError as e:
+            log_and_print(f"Error getting common costs: {str(e)}", level='error')
+    else:
+        log_and_print("No common costs found")
+
+    if snapshot.get('description'):
+        details['description'] = snapshot['description'].strip()
+
+    if snapshot.get('address'):
+        details['full_address'] = snapshot['address'].strip()
+
+    coordinates = parse_coordinates(snapshot.get('map_src'), MAP_CENTER_PATTERN)
+    if coordinates is None and snapshot.get('coordinates'):
+        coordinates = valid_coordinates(*snapshot['coordinates'])
+    if coordinates is not None:
+        details['latitude'], details['longitude'] = coordinates
+    else:
+        log_and_print("No location coordinates found")
+
+    return details
+
+def snapshot_from_html(html):
+    """Build a detail-page snapshot from server-rendered HTML"""
+    soup = BeautifulSoup(html, 'lxml')
+
+    snapshot = {
+        # Gallery images after the first are lazy loaded from data-src
+        'images': [img.get('data-src') or img.get('src') for img in soup.select(DETAIL_IMAGE_SELECTOR)],
+        'spec_rows': [],
+        'metro_stations': None,
+        'common_costs': None,
+        'description': None,
+        'address': None,
+        'map_src': None,
+        'coordinates': parse_coordinates(html, LOCATION_JSON_PATTERN)
+    }
+
+    for row in soup.select(SPEC_ROW_SELECTOR):
+        header = row.select_one(SPEC_HEADER_SELECTOR)
+        value = row.select_one(SPEC_VALUE_SELECTOR)
+        if header is not None and value is not None:
+            snapshot['spec_rows'].append([header.decode_contents(), value.decode_contents()])
+
+    for tab in soup.select(POI_TAB_SELECTOR):
+        holder = tab.find(string='Estaciones de metro')
+        if holder is None:
+            continue
+        snapshot['metro_stations'] = []
+        for station in holder.parent.parent.select(POI_ITEM_SELECTOR):
+            name = station.select_one(POI_NAME_SELECTOR)
+            distance = station.select_one(POI_DISTANCE_SELECTOR)
+            if name is not None and distance is not None:
+                snapshot['metro_stations'].append({'name': name.get_text(), 'distance': distance.get_text()})
+        break
+
+    common_costs = soup.select_one(COMMON_COSTS_SELECTOR)
+    if common_costs is not None:
+        snapshot['common_costs'] = common_costs.get_text()
+
+    description = soup.select_one(DESCRIPTION_SELECTOR)
+    if description is not None:
+        snapshot['description'] = description.get_text()
+
+    address = soup.select_one(f"{ADDRESS_SELECTOR} p")
+    if address is not None:
+        snapshot['address'] = address.get_text()
+
+    map_image = soup.select_one(MAP_IMAGE_SELECTOR)
+    if map_image is not None:
+        snapshot['map_src'] = map_image.get('src') or map_image.get('data-src')
+
+    return snapshot
+
+def parse_detail_html(html, price):
+    """Parse a server-rendered listing page into the same details dict as the browser path.
+
+    Returns None when the specifications table is missing, which usually means
+    the page needs client-side rendering (or we got a block page).
+    """
+    snapshot = snapshot_from_html(html)
+    if not snapshot['spec_rows']:
+        return None
+
+    details = apply_detail_snapshot(new_listing_details(), snapshot)
+    return finalize_details(details, price)
+
+def parse_search_html(html):
+    """Parse every result card on a search page in one pass.
+
+    Returns a list of raw cards ({'title', 'currency', 'amount', 'link'}), an
+    empty list when the page reports there are no more results, or None when
+    the page doesn't look like a results page at all.
+    """
+    soup = BeautifulSoup(html, 'lxml')
+
+    if soup.select_one(SEARCH_CONTAINER_SELECTOR) is None:
+        no_results = soup.select_one(NO_RESULTS_SELECTOR)
+        if no_results is not None and NO_RESULTS_TEXT in no_results.get_text().lower():
+            return []
+        return None
+
+    cards = []
+    for item in soup.select(SEARCH_ITEM_SELECTOR):
+        title = item.select_one(CARD_TITLE_SELECTOR)
+        price = item.select_one(CARD_PRICE_SELECTOR)
+        link = item.select_one(CARD_LINK_SELECTOR)
+        if title is None or price is None or link is None or not link.get('href'):
+            log_and_print("Skipping search card with missing title, price or link", level='warning')
+            continue
+
+        currency = price.select_one(CARD_CURRENCY_SELECTOR)
+        amount = price.select_one(CARD_AMOUNT_SELECTOR)
+        cards.append({
+            'title': title.get_text().strip(),
+            'currency': currency.get_text().strip() if currency is not None else None,
+            'amount': amount.get_text().strip() if amount is not None else None,
+            'link': link['href']
+        })
+
+    return cards
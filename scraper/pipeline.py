@@ -0,0 +1,122 @@
+import queue
+import threading
+
+from scraper.config import DETAIL_WORKERS, PIPELINE_QUEUE_SIZE
+from scraper.utils import log_and_print
+
+# Tells a consumer thread that its upstream stage is finished
+_DONE = object()
+
+
+class ScrapePipeline:
+    """Stream listings from the search stage through detail workers into the writer.
+
+    search producer -> dedupe -> detail workers -> database writer
+
+    The stages are connected by bounded queues, so detail extraction starts on
+    the first page's cards, a fast producer blocks instead of buffering the
+    whole catalogue, and if the producer crashes everything it already queued
+    is still extracted and saved. On shutdown (SIGTERM or Ctrl-C) queued
+    listings are dropped instead, leaving them pending in the checkpoint, and
+    only the ones already being extracted are finished and saved.
+    """
+
+    def __init__(self, extract, writer, known_urls, checkpointer=None,
+                 workers=DETAIL_WORKERS, queue_size=PIPELINE_QUEUE_SIZE):
+        self.extract = extract
+        self.writer = writer
+        self.known_urls = known_urls
+        self.checkpointer = checkpointer
+        self.workers = max(1, workers)
+        self._detail_queue = queue.Queue(maxsize=queue_size)
+        self._write_queue = queue.Queue(maxsize=queue_size)
+        self.scheduled = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+
+    def run(self, listings):
+        """Consume the ``listings`` iterable and block until every stage has drained"""
+        detail_threads = [
+            threading.Thread(target=self._detail_worker, name=f'detail-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        writer_thread = threading.Thread(target=self._write_worker, name='writer', daemon=True)
+        for thread in detail_threads:
+            thread.start()
+        writer_thread.start()
+
+        interrupted = False
+        try:
+            for data in listings:
+                # Claiming drops listings we already have unchanged, including ones
+                # that appear under more than one location
+                if not self.known_urls.claim(data["link"], data.get("card_hash")):
+                    log_and_print(f"Skipping duplicate listing: {data['title']}")
+                    continue
+                self.scheduled += 1
+                if self.checkpointer is not None:
+                    self.checkpointer.mark_pending(data)
+                self._detail_queue.put(data)
+        except (KeyboardInterrupt, SystemExit):
+            interrupted = True
+            raise
+        finally:
+            if interrupted:
+                dropped = self._drain_detail_queue()
+                log_and_print(f"Shutting down: dropped {dropped} queued listings, finishing in-flight ones")
+            for _ in detail_threads:
+                self._detail_queue.put(_DONE)
+            for thread in detail_threads:
+                thread.join()
+            self._write_queue.put(_DONE)
+            writer_thread.join()
+            log_and_print(
+                f"Pipeline finished: {self.scheduled} scheduled, {self.failed} failed, "
+                f"{self.writer.written} saved"
+            )
+
+    def _drain_detail_queue(self):
+        """Discard everything waiting for a detail worker and return how many were dropped"""
+        dropped = 0
+        while True:
+            try:
+                self._detail_queue.get_nowait()
+            except queue.Empty:
+                return dropped
+            dropped += 1
+
+    def _detail_worker(self):
+        while True:
+            data = self._detail_queue.get()
+            if data is _DONE:
+                return
+
+            try:
+                log_and_print(f"Extracting details for {data['title']}")
+                listing_details = self.extract(data)
+            except Exception as e:
+                log_and_print(f"Error extracting listing details: {str(e)}", level='error')
+                listing_details = None
+
+            if not listing_details:
+                with self._stats_lock:
+                    self.failed += 1
+                if self.checkpointer is not None:
+                    self.checkpointer.mark_done(data["link"])
+                continue
+
+            self._write_queue.put({
+                **data,
+                **listing_details
+            })
+
+    def _write_worker(self):
+        while True:
+            combined_property = self._write_queue.get()
+            if combined_property is _DONE:
+                return
+
+            try:
+                self.writer.add(combined_property)
+            except Exception as e:
+                log_and_print(f"Error writing properties: {str(e)}", level='error')
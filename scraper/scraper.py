@@ -1,9 +1,7 @@
 import os
 os.system('')  # Enable ANSI escape sequences in Windows
 
-from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -11,7 +9,10 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, NoSuchElementException
 import time
 import json
-import requests
+import signal
+import sys
+import itertools
+import threading
 import re
 import random
 import os
@@ -19,6 +20,13 @@ import datetime
 import webbrowser
 from scraper.config import (
     LOCATIONS,
+    BROWSER_POOL_SIZE,
+    DETAIL_WORKERS,
+    DETAIL_FETCH_MODE,
+    SEARCH_FETCH_MODE,
+    INCREMENTAL_MODE,
+    INCREMENTAL_STOP_PAGES,
+    MAX_PAGE_FAILURES,
     get_url_for_location
 )
 from urllib.parse import urlencode, urlparse, parse_qs
@@ -26,14 +34,35 @@ from scraper.database import (
     save_property, 
     save_single_property, 
     get_db_session, 
-    is_duplicate_listing,
+    PropertyWriter,
+    backfill_card_hashes,
     Session  # Add this import
 )
 from web.models import db, Run  # Add this import
 from web.app import app  # Import the Flask app
 from datetime import timedelta
 from scraper.utils import setup_logger, log_and_print  # Changed this line
-from web.utils import convert_to_embed_src  # Update import
+from scraper.browser import BrowserPool, get_random_user_agent, is_page_ready
+from scraper.throttle import throttle
+from scraper.uf import get_uf_value
+from scraper.dedupe import KnownUrlIndex, card_hash
+from scraper.http_client import fetch_html, GONE
+from scraper.page_scripts import SEARCH_CARDS_SCRIPT, DETAIL_SNAPSHOT_SCRIPT
+from scraper.parsing import (
+    SPEC_ROW_SELECTOR,
+    SEARCH_CONTAINER_SELECTOR,
+    SEARCH_ITEM_SELECTOR,
+    NO_RESULTS_SELECTOR,
+    NO_RESULTS_TEXT,
+    new_listing_details,
+    apply_detail_snapshot,
+    finalize_details,
+    parse_detail_html,
+    parse_search_html,
+    is_block_page_url
+)
+from scraper.pipeline import ScrapePipeline
+from scraper.checkpoints import RunCheckpointer, recover_interrupted_runs
 
 # At the top of the file, add these color constants
 ORANGE = '\033[93m'
@@ -44,23 +73,51 @@ LISTINGS_PER_PAGE = 48
 # At the start of the file
 logger = setup_logger()
 
-def get_uf_value():
-    try:
-        response = requests.get("https://mindicador.cl/api")
-        data = response.json()
-        return data['uf']['valor']
-    except Exception as e:
-        log_and_print(f"Error fetching UF value: {e}", level='error')
-        return None
+
+class DetailPageStats:
+    """Counts browser detail pages and how many needed a refresh before their specs rendered"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pages = 0
+            self.refreshed = 0
+            self.refreshes = 0
+
+    def record(self, refreshes):
+        with self._lock:
+            self.pages += 1
+            self.refreshes += refreshes
+            if refreshes:
+                self.refreshed += 1
+
+    def summary(self):
+        with self._lock:
+            return (f"{self.refreshed}/{self.pages} browser detail pages needed a refresh "
+                    f"({self.refreshes} refreshes total)")
+
+
+detail_page_stats = DetailPageStats()
 
 def wait_for_page_load(driver):
     try:
-        WebDriverWait(driver, 10).until(
-            lambda driver: driver.execute_script('return document.readyState') == 'complete'
-        )
+        WebDriverWait(driver, 10).until(is_page_ready)
     except TimeoutException:
         log_and_print("Page load timeout", level='warning')
 
+def wait_for_spec_rows(driver, timeout=10):
+    """Wait for the specifications table to render at least one row"""
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, f".andes-table__body {SPEC_ROW_SELECTOR}"))
+        )
+        return True
+    except TimeoutException:
+        return False
+
 def get_element_safely(driver, element, by, selector):
     """Safely get an element with retries for stale elements"""
     max_attempts = 3
@@ -87,17 +144,14 @@ def get_elements_safely(driver, element, by, selector):
                 raise
             continue
 
-def convert_price_to_clp(price_element):
+def price_to_clp(currency_symbol, amount, day=None):
+    """Convert a displayed price (currency symbol and amount text) to CLP at a given day's UF rate"""
     try:
-        # Get the currency symbol and amount
-        currency_symbol = price_element.find_element(By.CSS_SELECTOR, ".andes-money-amount__currency-symbol").text
-        amount = price_element.find_element(By.CSS_SELECTOR, ".andes-money-amount__fraction").text
-        
         # Remove dots and convert to float
         amount = float(amount.replace('.', '').replace(',', '.'))
         
         if currency_symbol == 'UF':
-            uf_value = get_uf_value()
+            uf_value = get_uf_value(day)
             if uf_value:
                 return int(amount * uf_value)
             else:
@@ -112,410 +166,376 @@ def convert_price_to_clp(price_element):
         log_and_print(f"Error converting price: {e}", level='error')
         return None
 
-def extract_listing_details(url, price):
-    chrome_options = Options()
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-software-rasterizer")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument(f"--user-agent={get_random_user_agent()}")
-    chrome_options.binary_location = "/usr/bin/chromium"
+def extract_listing_details(url, price, pool, mode=DETAIL_FETCH_MODE):
+    """Extract listing details, preferring the HTTP fast path when the mode allows it"""
+    if mode in ('http', 'auto'):
+        details = extract_listing_details_http(url, price)
+        if details is GONE:
+            log_and_print(f"Listing no longer exists, skipping {url}")
+            return None
+        if details is not None or mode == 'http':
+            return details
+        log_and_print(f"Fast path missing required fields, falling back to browser for {url}")
+
+    return extract_listing_details_browser(url, price, pool)
+
+def extract_listing_details_http(url, price):
+    """Extract listing details from the server-rendered HTML without a browser.
+
+    Returns GONE if the listing has been removed.
+    """
+    clean_base_url = clean_url(url)
+    log_and_print(f"Fetching {clean_base_url}")
+    html = fetch_html(clean_base_url)
+    if html is None or html is GONE:
+        return html
+
+    try:
+        return parse_detail_html(html, price)
+    except Exception as e:
+        log_and_print(f"{ORANGE}Warning: Error parsing listing HTML: {str(e)}{RESET}", level='warning')
+        return None
 
+def extract_listing_details_browser(url, price, pool):
+    """Extract listing details using a browser checked out from the pool"""
     max_retries = 3
     retry_count = 0
 
     while retry_count < max_retries:
         try:
-            driver = webdriver.Chrome(options=chrome_options)
-            """Extract detailed information from a listing page"""
-            try:
-                currently_rate_limited = True
-                attempts = 0
-                max_attempts = 3
+            with pool.driver() as driver:
+                return _extract_listing_details(driver, pool, url, price)
+        except Exception as e:
+            retry_count += 1
+            log_and_print(f"Attempt {retry_count}/{max_retries} failed: {str(e)}", level='warning')
+            if retry_count == max_retries:
+                raise
+            time.sleep(random.uniform(5, 10))
 
-                while currently_rate_limited and attempts < max_attempts:       
-                    try:
-                        # Random delay between 1 and 3 seconds
-                        time.sleep(random.uniform(1, 3))
-                        
-                        # Clear browser state safely
-                        driver.delete_all_cookies()
-                        try:
-                            driver.execute_script("window.localStorage.clear();")
-                            driver.execute_script("window.sessionStorage.clear();")
-                        except Exception:
-                            # Ignore localStorage/sessionStorage errors
-                            pass
+def _extract_listing_details(driver, pool, url, price):
+    """Extract detailed information from a listing page"""
+    try:
+        currently_rate_limited = True
+        attempts = 0
+        max_attempts = 3
+
+        while currently_rate_limited and attempts < max_attempts:       
+            try:
+                # Wait for our turn under the shared adaptive throttle
+                throttle.acquire()
                         
-                        # Set new random user agent
-                        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                            "userAgent": get_random_user_agent()
-                        })
+                # Persistent browsers keep their cookies and identity so challenges stay solved
+                if not pool.persistent:
+                    # Clear browser state safely
+                    driver.delete_all_cookies()
+                    try:
+                        driver.execute_script("window.localStorage.clear();")
+                        driver.execute_script("window.sessionStorage.clear();")
+                    except Exception:
+                        # Ignore localStorage/sessionStorage errors
+                        pass
+
+                    # Set new random user agent
+                    driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+                        "userAgent": get_random_user_agent()
+                    })
                         
-                        # Load the page with clean URL
-                        clean_base_url = clean_url(url)
-                        log_and_print(f"Getting {clean_base_url}")
-                        driver.get(clean_base_url)
+                # Load the page with clean URL
+                clean_base_url = clean_url(url)
+                log_and_print(f"Getting {clean_base_url}")
+                pool.navigate(driver, clean_base_url)
                         
-                        # Wait for main container
-                        WebDriverWait(driver, 10).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, "#ui-pdp-main-container"))
-                        )
+                # Wait for main container
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "#ui-pdp-main-container"))
+                )
                         
-                        # Perform random interactions
-                        perform_random_interactions(driver)
+                throttle.record_success()
+
+                # Perform random interactions
+                perform_random_interactions(driver)
                         
-                        currently_rate_limited = False
+                currently_rate_limited = False
                         
-                    except TimeoutException:
-                        attempts += 1
-                        wait_time = min(300, (2 ** attempts) * 60 + random.uniform(1, 30))
-                        log_and_print(f"Rate limited, attempt {attempts}/{max_attempts}, waiting {int(wait_time)} seconds")
-                        time.sleep(wait_time)
+            except TimeoutException:
+                attempts += 1
+                # The throttle slows every fetcher down instead of this one sleeping out the worst case
+                if is_block_page_url(driver.current_url):
+                    throttle.record_block()
+                else:
+                    throttle.record_timeout()
+                log_and_print(f"Rate limited, attempt {attempts}/{max_attempts} ({throttle.describe()})")
                 
-                if currently_rate_limited:
-                    return None
-
-                # Initialize details with empty values
-                details = {
-                    'images': [],
-                    'full_address': None,
-                    'google_maps_link': None,
-                    'metro_station': None,
-                    'common_costs': None,
-                    'has_gym': False,
-                    'floor': None,
-                    'total_floors': None,
-                    'furnished': None,
-                    'total_area': None,
-                    'apartment_type': None,
-                    'total_price': None,
-                    'description': None
-                }
+        if currently_rate_limited:
+            return None
 
-                # Get all images
-                try:
-                    images = driver.find_elements(By.CSS_SELECTOR, ".ui-pdp-image.ui-pdp-gallery__figure__image")
-                    details['images'] = [img.get_attribute('src') for img in images if img.get_attribute('src')]
-                except Exception as e:
-                    log_and_print(f"Error getting images: {e}", level='error')
+        # Initialize details with empty values
+        details = new_listing_details()
 
-                # Get specifications from the tables
-                try:
-                    # First attempt to find tables
-                    tables_found = False
-                    refresh_attempts = 0
-                    max_refresh_attempts = 3
-
-                    while not tables_found and refresh_attempts < max_refresh_attempts:
-                        try:
-                            driver.refresh()
-                            time.sleep(random.uniform(2, 4))
-                            
-                            # Add random interactions after refresh
-                            perform_random_interactions(driver)
-                            
-                            # Wait for tables to be present
-                            tables = WebDriverWait(driver, 10).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, ".andes-table__body"))
-                            )
-                            
-                            rows = driver.find_elements(By.CSS_SELECTOR, ".andes-table__row")
-                            if len(rows) > 0:
-                                tables_found = True
-                            else:
-                                log_and_print(f"Tables found but no rows present. Attempt {refresh_attempts + 1}/{max_refresh_attempts}")
-                                driver.refresh()
-                                time.sleep(random.uniform(2, 4))
-                                refresh_attempts += 1
-                        except TimeoutException:
-                            log_and_print(f"Tables not found. Attempting refresh. Attempt {refresh_attempts + 1}/{max_refresh_attempts}")
-                            driver.refresh()
-                            time.sleep(random.uniform(2, 4))
-                            refresh_attempts += 1
-
-                    if not tables_found:
-                        log_and_print(f"{ORANGE}Warning: Failed to load tables after all refresh attempts{RESET}", level='warning')
-                        return None
-
-                    # Process the tables as before
-                    for row in rows:
-                        try:
-                            header = row.find_element(By.CSS_SELECTOR, ".andes-table__header__container").get_attribute("innerHTML")
-                            value = row.find_element(By.CSS_SELECTOR, ".andes-table__column--value").get_attribute("innerHTML")
-
-                            mapping = {
-                                'Superficie total': ('total_area', value.replace("m²", "")),
-                                'Número de piso de la unidad': ('floor', value),
-                                'Cantidad de pisos': ('total_floors', value),
-                                'Tipo de departamento': ('apartment_type', value),
-                                'Amoblado': ('furnished', value == 'Sí'),
-                                'Gimnasio': ('has_gym', value == 'Sí'),
-                                'Dormitorios': ('bedrooms', value),
-                                'Baños': ('bathrooms', value),
-                                'Estacionamientos': ('parking_spots', value),
-                                'Bodegas': ('storage_units', value),
-                            }
-                            
-                            if header in mapping:
-                                key, val = mapping[header]
-                                if val is None or val == "":
-                                    log_and_print(f"{ORANGE}Warning: Skipping empty value for {key}{RESET}", level='warning')
-                                details[key] = val
-
-                        except Exception as e:
-                            log_and_print(f"{ORANGE}Warning: Error processing row: {str(e)}{RESET}", level='warning')
-                            continue
+        # Get specifications from the tables, refreshing only when the first load didn't render them
+        try:
+            tables_found = wait_for_spec_rows(driver)
+            refresh_attempts = 0
+            max_refresh_attempts = 3
 
-                except Exception as e:
-                    log_and_print(f"Error getting specifications: {str(e)}", level='error')
-                    time.sleep(10)
+            while not tables_found and refresh_attempts < max_refresh_attempts:
+                refresh_attempts += 1
+                log_and_print(f"Tables not found. Attempting refresh. Attempt {refresh_attempts}/{max_refresh_attempts}")
+                throttle.acquire()
+                driver.refresh()
 
-                try:
-                    metro_station = driver.find_element(By.CSS_SELECTOR, ".andes-tab-content.ui-vip-poi__tab-content")
-                    metro_station_holder = metro_station.find_element(By.XPATH, ".//*[text()='Estaciones de metro']")
-                    if metro_station_holder is None:
-                        log_and_print("No metro station found")
-                        return details
-                    metro_station_holder_parent = metro_station_holder.find_element(By.XPATH, "./..")
-                    metro_station_list = metro_station_holder_parent.find_elements(By.CSS_SELECTOR, ".ui-vip-poi__item")
-
-                    all_metro_stations = []
-
-                    for station in metro_station_list:
-                        metro_station_name = station.find_element(By.CSS_SELECTOR, ".ui-pdp-color--BLACK.ui-pdp-size--XSMALL.ui-pdp-family--REGULAR")
-                        metro_station_distance = station.find_element(By.CSS_SELECTOR, ".ui-pdp-color--GRAY.ui-pdp-size--XSMALL.ui-pdp-family--REGULAR")
-                        
-                        # Parse Spanish format: "10 mins - 751 metros" or "12 mins - 1.523 metros"
-                        distance_text = metro_station_distance.text
-                        parts = distance_text.split(' - ')  # Split by the dash
-                        walking_minutes = parts[0].split(' ')[0]  # Get "10" from "10 mins"
-                        distance_meters = parts[1].split(' ')[0].replace('.', '')  # Get "1523" from "1.523"
-                        
-                        all_metro_stations.append({
-                            'name': metro_station_name.text,
-                            'walking_minutes': walking_minutes,
-                            'distance_meters': distance_meters
-                        })
-                    details['metro_station'] = all_metro_stations
-                    log_and_print(f"Found metro station {details['metro_station']}")
+                # Add random interactions after refresh
+                perform_random_interactions(driver)
 
-                except NoSuchElementException:
-                    log_and_print("No metro stations found.")
+                tables_found = wait_for_spec_rows(driver)
+                if not tables_found:
+                    throttle.record_timeout()
 
-                except Exception as e:
-                    log_and_print(f"Error getting metro station: {str(e)}", 
-                                  level='error', 
-                                  color=ORANGE)
+            detail_page_stats.record(refresh_attempts)
 
-                # Get common costs from div
-                try:
-                    common_costs = driver.find_element(By.CSS_SELECTOR, ".ui-pdp-color--GRAY.ui-pdp-size--XSMALL.ui-pdp-family--REGULAR.ui-pdp-maintenance-fee-ltr")
-                    common_costs_text = common_costs.text.strip()
-                    common_costs_text = common_costs_text.replace("Gastos comunes aproximados $", "")
-                    common_costs_text = common_costs_text.replace("Gastos comunes desde $", "")
-                    common_costs_text = common_costs_text.replace(".", "")
-                    common_costs_text = common_costs_text.replace(",", ".")
-                    common_costs_text = common_costs_text.strip()
+            if not tables_found:
+                log_and_print(f"{ORANGE}Warning: Failed to load tables after all refresh attempts{RESET}", level='warning')
+                return None
 
-                    details['common_costs'] = int(common_costs_text)
-                    log_and_print("Found common costs", details['common_costs'])
+        except Exception as e:
+            log_and_print(f"Error getting specifications: {str(e)}", level='error')
+            time.sleep(10)
 
-                except NoSuchElementException:
-                    log_and_print("No common costs found")
+        # Read every section we need in a single round trip
+        snapshot = driver.execute_script(DETAIL_SNAPSHOT_SCRIPT)
+        apply_detail_snapshot(details, snapshot)
+        if details['full_address']:
+            log_and_print(f"Found address: {details['full_address']}")
 
-                except Exception as e:
-                    log_and_print(f"Error getting common costs: {str(e)}", level='error')
+        log_and_print("Calculating total price", price, details['common_costs'])
+        return finalize_details(details, price)
+            
+    except Exception as e:
+        log_and_print(f"{ORANGE}Warning: Error processing listing: {str(e)}{RESET}", level='warning')
+        return None
 
+def card_to_property(card):
+    """Turn a raw search card into the {"title", "price", "link"} record used downstream.
+
+    The record also carries the displayed currency and a hash of the card so
+    changed listings can be detected without fetching their detail page.
+    """
+    return {
+        "title": card['title'],
+        "price": price_to_clp(card['currency'], card['amount']),
+        "link": clean_url(card['link']),
+        "currency": card['currency'],
+        "card_hash": card_hash(card['title'], card['currency'], card['amount'])
+    }
+
+def scrape_search_page_http(url):
+    """Fetch and parse a search results page without a browser.
+
+    Returns the page's property records, an empty list at the end of the
+    results, or None when the page couldn't be fetched or parsed.
+    """
+    html = fetch_html(url)
+    if html is GONE:
+        # Paging past the last result page
+        return []
+    if html is None:
+        return None
 
-                # Get description
-                try:
-                    description = driver.find_element(By.CSS_SELECTOR, ".ui-pdp-description__content").text.strip()
-                    details['description'] = description
-                except Exception as e:
-                    log_and_print(f"Error getting description: {str(e)}", level='error')
+    cards = parse_search_html(html)
+    if cards is None:
+        # Usually a soft block served with a 200 status
+        log_and_print("Search page has no listings container", level='warning')
+        throttle.record_block()
+        return None
 
+    log_and_print(f"Found {len(cards)} listings")
+    return [card_to_property(card) for card in cards[:LISTINGS_PER_PAGE]]
 
-                # Get address information
-                try:
-                    location_container = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".ui-pdp-media.ui-vip-location__subtitle.ui-pdp-color--BLACK"))
-                    )
-                    address = location_container.find_element(By.CSS_SELECTOR, "p").text.strip()
-                    
-                    # Click on the map image to load it
-                    map_element = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, "#ui-vip-location__map > div > img"))
-                    )
-                            
-                    driver.execute_script("arguments[0].click();", map_element)
-                    
-                    # Wait for the Google Maps link to appear after map loads
-                    maps_link = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((
-                            By.CSS_SELECTOR, 
-                            'a[title="Open this area in Google Maps (opens a new window)"]'
-                        ))
-                    ).get_attribute('href')
-                    
-                    details['full_address'] = address
-                    details['google_maps_link'] = maps_link
-                    log_and_print(f"Found address: {address}")
-                    log_and_print(f"Found maps link: {maps_link}")
-                except Exception as e:
-                    log_and_print(f"Error getting address: {str(e)}", level='error')
-                    details['full_address'] = None
-                    details['google_maps_link'] = None
+def scrape_search_page_browser(driver, pool, url, page):
+    """Load a search results page in the browser and collect its listings.
 
-                log_and_print("Calculating total price", price, details['common_costs'])
-                if price is not None:
-                    details['total_price'] = price + (details['common_costs'] if details['common_costs'] is not None else 0)
-                else:
-                    details['total_price'] = None
+    Returns the page's property records, an empty list at the end of the
+    results, or None when the listings timed out (usually rate limiting).
+    """
+    throttle.acquire()
+    pool.navigate(driver, url)
+    wait_for_page_load(driver)
 
-                # Before returning
-                missing_fields = [k for k, v in details.items() if v is None]
-                if missing_fields:
-                    log_and_print(f"Warning: Missing fields in final details: {', '.join(missing_fields)}", 
-                                  level='warning', 
-                                  color=ORANGE)
+    if is_block_page_url(driver.current_url):
+        log_and_print(f"Redirected to a verification page on page {page + 1}", level='warning')
+        throttle.record_block()
+        return None
 
-                return details
-            
-            except Exception as e:
-                log_and_print(f"{ORANGE}Warning: Error processing listing: {str(e)}{RESET}", level='warning')
-                return None
-        except Exception as e:
-            retry_count += 1
-            log_and_print(f"Attempt {retry_count}/{max_retries} failed: {str(e)}", level='warning')
-            try:
-                driver.quit()
-            except:
-                pass
-            if retry_count == max_retries:
-                raise
-            time.sleep(random.uniform(5, 10))
+    try:
+        # Wait for listings container
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_CONTAINER_SELECTOR))
+        )
 
-def scrape_links_from_location():
-    chrome_options = Options()
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument(f"--user-agent={get_random_user_agent()}")
-    chrome_options.binary_location = "/usr/bin/chromium"
+        log_and_print("Found listings container")
+        
+        # Get all listing elements
+        listings = WebDriverWait(driver, 10).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, SEARCH_ITEM_SELECTOR))
+        )
+
+        # Pull every card in one round trip and parse it in Python
+        cards = driver.execute_script(SEARCH_CARDS_SCRIPT) or []
+        throttle.record_success()
+
+        log_and_print(f"Found {len(cards)} listings")
+
+        if not cards:
+            log_and_print("No listings found on this page. Stopping.", level='warning')
+            return []
 
-    timeout_reattempt = 0;
+        if len(cards) < len(listings):
+            log_and_print(f"Skipped {len(listings) - len(cards)} cards with missing title, price or link", level='warning')
 
-    driver = webdriver.Chrome(options=chrome_options)
-    session = get_db_session()
+        return [card_to_property(card) for card in cards[:LISTINGS_PER_PAGE]]
+
+    except TimeoutException:
+        log_and_print(f"Timeout waiting for listings on page {page + 1}", level='warning')
+
+        # Check if we are just at the end of the listing page.
+        try:
+            no_results = driver.find_element(By.CSS_SELECTOR, NO_RESULTS_SELECTOR)
+            if no_results and NO_RESULTS_TEXT in no_results.text.lower():
+                log_and_print(f"No more listings found on page {page + 1}", level='warning')
+                return []
+        except NoSuchElementException:
+            log_and_print(f"No 'no results' message found on page {page + 1}", level='warning')
+
+        throttle.record_timeout()
+        return None
+
+def iter_location_properties(pool, mode=SEARCH_FETCH_MODE, known_urls=None,
+                             incremental=INCREMENTAL_MODE, stop_pages=INCREMENTAL_STOP_PAGES,
+                             start_location=0, start_page=0, on_page=None):
+    """Yield property records page by page across every configured location.
+
+    In incremental mode results are sorted newest-first and a location stops
+    paging after ``stop_pages`` consecutive pages made up entirely of URLs
+    already in ``known_urls``. A location is skipped once one of its pages
+    has failed ``MAX_PAGE_FAILURES`` times in a row.
+
+    Paging starts at ``start_page`` of ``LOCATIONS[start_location]`` so an
+    interrupted run can resume. ``on_page(location_index, page)`` is called
+    with the next page to fetch once each page's records have been consumed.
+    """
+    incremental = incremental and known_urls is not None
+
+    # The browser is only checked out if a page actually needs it
+    driver = None
 
     try:
-        all_properties = []
-        
-        for location in LOCATIONS:
+        for location_index, location in enumerate(LOCATIONS):
+            if location_index < start_location:
+                continue
             log_and_print(f"\nScraping location: {location}")
-            
 
-            page = 0
-            still_scraping_properties = True
+            page = start_page if location_index == start_location else 0
+            known_pages = 0
+            failed_attempts = 0
             
-            while still_scraping_properties:
-
-                url = get_url_for_location(location, page * LISTINGS_PER_PAGE)
+            while True:
+                url = get_url_for_location(location, page * LISTINGS_PER_PAGE, newest_first=incremental)
                 log_and_print(f"\nScraping page {page + 1} (offset: {page * LISTINGS_PER_PAGE})")
                 log_and_print(f"{url}")
-                
-                driver.get(url)
-                wait_for_page_load(driver)
 
-                try:
-                    # Wait for listings container
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "ol.ui-search-layout"))
-                    )
+                properties = None
+                if mode in ('http', 'auto'):
+                    properties = scrape_search_page_http(url)
+                    if properties is None and mode == 'auto':
+                        log_and_print("HTTP search page failed, falling back to browser")
+
+                if properties is None and mode != 'http':
+                    if driver is None:
+                        driver = pool.acquire()
+                    properties = scrape_search_page_browser(driver, pool, url, page)
+                    # Hand a worn-out browser back so the pool recycles it like any other
+                    if pool.worn_out(driver):
+                        pool.release(driver)
+                        driver = None
+
+                if properties is None:
+                    # Probably rate limited; the fetchers already told the throttle, which paces the retry
+                    failed_attempts += 1
+                    if failed_attempts >= MAX_PAGE_FAILURES:
+                        log_and_print(f"Giving up on {location} after {failed_attempts} failed attempts "
+                                      f"on page {page + 1}", level='error')
+                        break
+                    log_and_print(f"Rate limited, attempt {failed_attempts}/{MAX_PAGE_FAILURES} ({throttle.describe()})")
+                    continue
 
-                    log_and_print("Found listings container")
-                    
-                    # Get all listing elements
-                    listings = WebDriverWait(driver, 10).until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li.ui-search-layout__item"))
-                    )
+                if not properties:
+                    break
 
-                    log_and_print(f"Found {len(listings)} listings")
-
-                    if not listings:
-                        log_and_print("No listings found on this page. Stopping.", level='warning')
-                        still_scraping_properties = False
-                        continue
-
-                    if LISTINGS_PER_PAGE:
-                        listings = listings[:LISTINGS_PER_PAGE]
-
-                    log_and_print(f"Processing {len(listings)} listings")
-
-                    for listing in listings:
-                        try:
-                            title = WebDriverWait(listing, 10).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, ".poly-component__headline"))
-                            ).text
-                            
-                            price_element = WebDriverWait(listing, 10).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, ".andes-money-amount"))
-                            )
-                            
-                            link = WebDriverWait(listing, 10).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "div.poly-card__content > h2 > a"))
-                            ).get_attribute("href")
-                
-                            link = clean_url(link)
-                            
-                            price = convert_price_to_clp(price_element)
-                            
-                            all_properties.append({
-                                "title": title,
-                                "price": price,
-                                "link": link
-                            })
-
-                            timeout_reattempt = 0;
-                            
-                        except Exception as e:
-                            log_and_print(f"Error collecting listing preview data: {str(e)}", level='error')
-                            continue
-
-                except TimeoutException:
-                    log_and_print(f"Timeout waiting for listings on page {page + 1}", level='warning')
-
-                    # Check if we are just at the end of the listing page.
-                    # Check if we have an elemet with the innerHTML of En esta categoría no hay inmuebles que coincidan con tu búsqueda.
+                failed_attempts = 0
+                page += 1
 
-                    try:
-                        # Check for "no results" message
-                        no_results = driver.find_element(By.CSS_SELECTOR, ".ui-search-rescue__title")
-                        if no_results and "no hay inmuebles que coincidan con tu búsqueda" in no_results.text.lower():
-                            log_and_print(f"No more listings found on page {page + 1}", level='warning')
-                            still_scraping_properties = False
-                            continue
-                    except NoSuchElementException:
-                        log_and_print(f"No 'no results' message found on page {page + 1}", level='warning')
-                        # Check if we are getting rate limited
-
-                        timeout_reattempt += 1
-                        wait_time = min(300, (2 ** timeout_reattempt) * 60 + random.uniform(1, 30))
-                        log_and_print(f"Rate limited, attempt {timeout_reattempt}/{3}, waiting {int(wait_time)} seconds")
-                        time.sleep(wait_time)
-                        pass
+                if incremental:
+                    if all(known_urls.is_unchanged(data["link"], data["card_hash"]) for data in properties):
+                        known_pages += 1
+                    else:
+                        known_pages = 0
 
-                    continue
-                page += 1
+                yield from properties
+
+                if incremental and known_pages >= stop_pages:
+                    log_and_print(f"Stopping {location} after {known_pages} pages of already known listings")
+                    break
 
-        return all_properties
+                if on_page is not None:
+                    on_page(location_index, page)
+
+            if on_page is not None:
+                on_page(location_index + 1, 0)
 
     finally:
-        session.close()  # Close the specific session
-        driver.quit()
+        if driver is not None:
+            pool.release(driver)
+
+def scrape_links_from_location(pool, mode=SEARCH_FETCH_MODE):
+    """Collect the property records from every search page of every location"""
+    return list(iter_location_properties(pool, mode))
+
+def scrape_and_save(run_id, pool, known_urls, checkpointer, workers=DETAIL_WORKERS):
+    """Stream search results through the detail workers into the database.
+
+    Progress is checkpointed after every search page; listings left pending
+    by an interrupted run are extracted first. Returns the total number of
+    properties saved for the run, including before a restart.
+    """
+    def extract(data):
+        return extract_listing_details(data["link"], data["price"], pool)
+
+    pending = checkpointer.pending()
+    if pending:
+        log_and_print(f"Resuming with {len(pending)} pending listings")
+    listings = itertools.chain(
+        pending,
+        iter_location_properties(
+            pool,
+            known_urls=known_urls,
+            start_location=checkpointer.location_index,
+            start_page=checkpointer.page,
+            on_page=checkpointer.save
+        )
+    )
+
+    detail_page_stats.reset()
+
+    # The writer flushes whatever is still buffered when the run ends, even on errors
+    with PropertyWriter(run_id, known_urls=known_urls, on_flush=checkpointer.mark_saved,
+                        on_drop=checkpointer.mark_done) as writer:
+        pipeline = ScrapePipeline(extract, writer, known_urls, checkpointer=checkpointer, workers=workers)
+        pipeline.run(listings)
+
+    log_and_print(detail_page_stats.summary())
+
+    backfill_card_hashes(known_urls.take_backfill())
+    return checkpointer.saved
 
 def clean_url(url):
     """Remove tracking and unnecessary query parameters from URLs"""
@@ -533,34 +553,6 @@ def clean_url(url):
     
     return base_url
 
-def get_random_user_agent():
-    """Generate a random Chrome-based user agent"""
-    chrome_versions = [
-        '90.0.4430.212',
-        '91.0.4472.124',
-        '92.0.4515.159',
-        '93.0.4577.82',
-        '94.0.4606.81',
-        '95.0.4638.69',
-        '96.0.4664.45',
-        '97.0.4692.71',
-        '98.0.4758.102',
-        '99.0.4844.51'
-    ]
-    
-    os_versions = [
-        'Windows NT 10.0; Win64; x64',
-        'Windows NT 10.0; WOW64',
-        'Macintosh; Intel Mac OS X 10_15_7',
-        'X11; Linux x86_64',
-        'X11; Ubuntu; Linux x86_64'
-    ]
-    
-    chrome_version = random.choice(chrome_versions)
-    os_version = random.choice(os_versions)
-    
-    return f'Mozilla/5.0 ({os_version}) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{chrome_version} Safari/537.36'
-
 def perform_random_interactions(driver):
     """Simulate random human-like interactions on the page"""
     try:
@@ -606,53 +598,49 @@ if __name__ == "__main__":
     import time
     
     SCRAPE_INTERVAL = int(os.getenv('SCRAPE_INTERVAL', 3600))  # Default to 1 hour if not set
+
+    # Turn `docker stop` into a normal exit so buffered writes are flushed and browsers quit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     log_and_print(f"Starting scraper with {SCRAPE_INTERVAL} seconds interval")
+
+    # Pick up a run interrupted by a restart instead of starting over
+    with app.app_context():
+        resume_run_id = recover_interrupted_runs()
     
     while True:
         try:
             log_and_print(f"\nStarting new scraping run at {datetime.datetime.now()}")
             
-            # Use Flask app context
-            with app.app_context():
-                # Create a new run with 'running' status
-                run = Run(
-                    started_at=datetime.datetime.utcnow(),
-                    status='running'
-                )
-                db.session.add(run)
-                db.session.commit()
+            # Use Flask app context and a browser pool shared by every stage of the run
+            with app.app_context(), BrowserPool(size=max(BROWSER_POOL_SIZE, DETAIL_WORKERS + 1)) as browser_pool:
+                run = db.session.get(Run, resume_run_id) if resume_run_id is not None else None
+                resume_run_id = None
+                if run is None:
+                    # Create a new run with 'running' status
+                    run = Run(
+                        started_at=datetime.datetime.utcnow(),
+                        status='running'
+                    )
+                    db.session.add(run)
+                    db.session.commit()
+                checkpointer = RunCheckpointer.load(run.id)
                 
                 try:
-                    # Get properties using configuration settings
-                    property_links = scrape_links_from_location()
-                    session = get_db_session()  # Get a new session
+                    session = get_db_session()
+                    try:
+                        known_urls = KnownUrlIndex.load(session)
+                    finally:
+                        session.close()
 
-                    if not property_links:
-                        log_and_print("No properties were scraped!", level='warning')
-                        run.status = 'completed'
-                        run.total_properties = 0
-                    else:
-                        log_and_print(f"Scraped {len(property_links)} properties")
-
-                    for index, data in enumerate(property_links):
-                        if is_duplicate_listing(session, data["link"]):
-                            log_and_print(f"Skipping duplicate listing: {data['title']}")
-                            continue
-
-                        log_and_print(f"Extracting details for {data['title']} ({index}/{len(property_links)})")
-                        listing_details = extract_listing_details(data["link"], data["price"])
-                    
-                        if listing_details:
-                            combined_property = {
-                                **data,
-                                **listing_details
-                            }
-                            save_property(combined_property, run.id)
+                    saved_count = scrape_and_save(run.id, browser_pool, known_urls, checkpointer)
+
+                    if not saved_count:
+                        log_and_print("No new properties were saved!", level='warning')
 
                     try:
                         run.status = 'completed'
-                        run.total_properties = 123
-                        log_and_print(f"\nSuccessfully scraped and saved {123} total properties")
+                        run.total_properties = saved_count
+                        log_and_print(f"\nSuccessfully scraped and saved {saved_count} total properties")
                     except Exception as e:
                         log_and_print(f"Error saving to database: {str(e)}", level='error')
                         run.status = 'failed'
@@ -662,11 +650,14 @@ if __name__ == "__main__":
                     run.completed_at = datetime.datetime.utcnow()
                     run.next_run_at = run.completed_at + timedelta(seconds=SCRAPE_INTERVAL)
                     db.session.commit()
+                    checkpointer.clear()
 
                 except Exception as e:
                     log_and_print(f"Error during scraping: {str(e)}", level='error')
                     run.status = 'failed'
                     run.error_message = f"Scraping error: {str(e)}"
+                    db.session.commit()
+                    checkpointer.clear()
             
         except Exception as e:
             log_and_print(f"Critical error: {str(e)}", level='error')
@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+from scraper.config import (
+    THROTTLE_START_RATE,
+    THROTTLE_MIN_RATE,
+    THROTTLE_MAX_RATE,
+    THROTTLE_BACKOFF,
+    THROTTLE_RECOVERY,
+    THROTTLE_BLOCK_PAUSE
+)
+from scraper.utils import log_and_print
+
+
+class AdaptiveThrottle:
+    """Token bucket shared by every fetcher, with AIMD rate control.
+
+    ``acquire`` blocks until a request may start. Fetchers report how each
+    request went: successes raise the rate additively up to ``max_rate``,
+    timeouts, errors and block pages cut it multiplicatively down to ``min_rate``.
+    A block page also pauses every fetcher for ``block_pause`` seconds.
+    """
+
+    def __init__(self, rate=THROTTLE_START_RATE, min_rate=THROTTLE_MIN_RATE, max_rate=THROTTLE_MAX_RATE,
+                 backoff=THROTTLE_BACKOFF, recovery=THROTTLE_RECOVERY, block_pause=THROTTLE_BLOCK_PAUSE,
+                 burst=1, jitter=0.5, log_every=20):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.backoff = backoff
+        self.recovery = recovery
+        self.block_pause = block_pause
+        self.burst = burst
+        self.jitter = jitter
+        self.log_every = log_every
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._last_backoff = float('-inf')
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """Block until the caller may start its next request"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Take the token now (possibly going into debt) so waiting callers queue up in order
+            self._tokens -= 1
+            delay = max(0.0, self._updated - now) + max(0.0, -self._tokens) / self.rate
+        if delay > 0:
+            time.sleep(delay + random.uniform(0, self.jitter))
+
+    def record_success(self):
+        """Additive increase after a request that loaded normally"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery)
+            self._successes += 1
+            should_log = self._successes % self.log_every == 0
+        if should_log:
+            log_and_print(f"Throttle: {self.describe()}")
+
+    def record_timeout(self):
+        """Multiplicative decrease after a timeout"""
+        self._back_off("timeout")
+
+    def record_error(self, reason="error"):
+        """Multiplicative decrease after a connection error or unexpected response"""
+        self._back_off(reason)
+
+    def record_block(self):
+        """Multiplicative decrease plus a pause after a block or verification page"""
+        self._back_off("block page", pause=self.block_pause)
+
+    def _back_off(self, reason, pause=0):
+        with self._lock:
+            now = time.monotonic()
+            # Requests already in flight tend to fail together; count them as one signal
+            if now - self._last_backoff < 1 / self.rate and not pause:
+                return
+            self._last_backoff = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self._tokens = min(self._tokens, 0.0)
+            if pause:
+                self._updated = max(self._updated, now + pause)
+        log_and_print(f"Throttle backing off after {reason}: {self.describe()}", level='warning')
+
+    def describe(self):
+        return f"{self.rate * 60:.1f} requests/min"
+
+
+# Shared by every fetcher so the total request rate adapts to the site regardless of worker count
+throttle = AdaptiveThrottle()
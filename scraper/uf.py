@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy.dialects.postgresql import insert
+
+from scraper.config import UF_API_URL, UF_CACHE_TTL, UF_FAILURE_TTL, HTTP_TIMEOUT
+from scraper.database import Session
+from scraper.http_client import get_http_session
+from scraper.utils import log_and_print
+from web.models import UFRate
+
+
+def fetch_mindicador_uf(day):
+    """Fetch the UF value for a given day from the mindicador.cl API"""
+    response = get_http_session().get(
+        f"{UF_API_URL}/uf/{day.strftime('%d-%m-%Y')}",
+        headers={'Accept': 'application/json'},
+        timeout=HTTP_TIMEOUT
+    )
+    response.raise_for_status()
+    serie = response.json().get('serie') or []
+    if not serie:
+        raise ValueError(f"No UF value published for {day}")
+    return float(serie[0]['valor'])
+
+
+class UFRateProvider:
+    """UF exchange rates backed by an in-process TTL cache and the uf_rates table.
+
+    ``source`` is any callable taking a date and returning the UF value, so a
+    local stub can stand in for the real API. When the source fails we fall
+    back to the most recent rate we know about, and don't ask the source
+    again for that day until ``failure_ttl`` has passed.
+
+    Lookups for the same day are serialized so only one of them hits the
+    source; lookups for other days and cache hits never wait on it.
+    """
+
+    def __init__(self, source=fetch_mindicador_uf, ttl=UF_CACHE_TTL, failure_ttl=UF_FAILURE_TTL):
+        self.source = source
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self._cache = {}
+        self._day_locks = {}
+        self._lock = threading.Lock()
+
+    def get_rate(self, day=None):
+        """Return the UF value for ``day`` (today by default), or None if unknown"""
+        day = day or date.today()
+
+        found, value = self._cached(day)
+        if found:
+            return value
+
+        with self._day_lock(day):
+            # Another thread may have looked the day up while we waited
+            found, value = self._cached(day)
+            if found:
+                return value
+
+            ttl = self.ttl
+            value = self._load(day)
+            if value is None:
+                try:
+                    value = self.source(day)
+                    self._store(day, value)
+                except Exception as e:
+                    log_and_print(f"Error fetching UF value: {e}", level='error')
+                    ttl = self.failure_ttl
+                    value = self._last_known(day)
+                    if value is not None:
+                        log_and_print(f"Using last known UF value {value}", level='warning')
+
+            with self._lock:
+                self._cache[day] = (value, time.monotonic(), ttl)
+            return value
+
+    def _cached(self, day):
+        """(True, value) for a fresh cache entry, which may be a remembered failure"""
+        with self._lock:
+            cached = self._cache.get(day)
+        if cached and time.monotonic() - cached[1] < cached[2]:
+            return True, cached[0]
+        return False, None
+
+    def _day_lock(self, day):
+        with self._lock:
+            return self._day_locks.setdefault(day, threading.Lock())
+
+    def _load(self, day):
+        session = Session()
+        try:
+            rate = session.get(UFRate, day)
+            return rate.value if rate else None
+        except Exception as e:
+            log_and_print(f"Error loading UF value: {e}", level='warning')
+            return None
+        finally:
+            session.close()
+
+    def _store(self, day, value):
+        session = Session()
+        try:
+            session.execute(
+                insert(UFRate)
+                .values(date=day, value=value, fetched_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['date'])
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            log_and_print(f"Error saving UF value: {e}", level='warning')
+        finally:
+            session.close()
+
+    def _last_known(self, day):
+        with self._lock:
+            earlier = {cached_day: cached[0] for cached_day, cached in self._cache.items()
+                       if cached_day <= day and cached[0] is not None}
+        if earlier:
+            return earlier[max(earlier)]
+
+        session = Session()
+        try:
+            rate = (
+                session.query(UFRate)
+                .filter(UFRate.date <= day)
+                .order_by(UFRate.date.desc())
+                .first()
+            )
+            return rate.value if rate else None
+        except Exception as e:
+            log_and_print(f"Error loading last known UF value: {e}", level='warning')
+            return None
+        finally:
+            session.close()
+
+
+uf_rates = UFRateProvider()
+
+def get_uf_value(day=None):
+    """Return the UF value in CLP for a given day (today by default)"""
+    return uf_rates.get_rate(day)
@@ -1,26 +1,36 @@
 import logging
 import os
+import threading
 from datetime import datetime
 
 _logger = None
+_logger_lock = threading.Lock()
 
 def setup_logger():
     """Configure logging to both file and console"""
     global _logger
     if _logger is not None:
         return _logger
-        
+
+    # Worker threads may log for the first time concurrently
+    with _logger_lock:
+        if _logger is None:
+            _logger = _create_logger()
+    return _logger
+
+def _create_logger():
+    """Build the scraper logger with its file and console handlers"""
     # Create logs directory if it doesn't exist
     logs_dir = 'logs'
     if not os.path.exists(logs_dir):
         os.makedirs(logs_dir)
 
     # Create a logger
-    _logger = logging.getLogger('scraper')
-    _logger.setLevel(logging.INFO)
+    logger = logging.getLogger('scraper')
+    logger.setLevel(logging.INFO)
     
     # Clear any existing handlers
-    _logger.handlers = []
+    logger.handlers = []
 
     # Create formatters
     file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
@@ -38,10 +48,10 @@ def setup_logger():
     console_handler.setFormatter(console_formatter)
 
     # Add handlers to logger
-    _logger.addHandler(file_handler)
-    _logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
 
-    return _logger
+    return logger
 
 def log_and_print(message, level='info', color=None):
     """Helper function to both log and print messages"""
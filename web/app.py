@@ -1,16 +1,37 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, g, has_request_context, make_response, Response, stream_with_context
 from flask_admin import Admin
 from flask_admin.contrib.sqla import ModelView
-from web.models import db, Run, Property, PropertyImage, MetroStation, PropertyPreference
+from web.models import db, Run, Property, PropertyImage, MetroStation, PropertyPreference, PropertyPriceHistory
 from datetime import datetime, timedelta
-from sqlalchemy import desc
+from sqlalchemy import desc, and_, or_, tuple_, event, func, select, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession, selectinload, contains_eager
+from web.geo import covering_cells, distance_expression, within_cells
+from web.utils import encode_cursor, decode_cursor
 import os
+import csv
+import io
+import json
+import math
+import zlib
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from itertools import chain
+from functools import wraps
 from markupsafe import Markup
-from web.utils import convert_to_embed_src
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 60))  # Seconds a list's total count is reused
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', 10))  # Requests running more SQL statements than this are logged
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 256))  # Rendered list responses kept in memory
+MAX_NEAR_RADIUS_M = float(os.getenv('MAX_NEAR_RADIUS_M', 50000))  # Largest radius /api/properties/near accepts
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))  # Rows fetched per round trip from the export cursor
 db.init_app(app)
 
 # Create admin interface
@@ -47,10 +68,10 @@ class PropertyView(ModelView):
         'total_floors',
         'furnished', 
         'has_gym',
-        'google_maps_link',
+        'google_maps_url',
         'created_at'
     )
-    column_searchable_list = ['title', 'location', 'original_url', 'google_maps_link']
+    column_searchable_list = ['title', 'location', 'original_url']
     column_filters = [
         'location', 
         'furnished', 
@@ -75,10 +96,10 @@ class PropertyView(ModelView):
         'common_costs': _price_formatter,
         'total_price': _price_formatter,
         'created_at': lambda v, c, m, p: m.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        'google_maps_link': _maps_link_formatter
+        'google_maps_url': _maps_link_formatter
     }
     
-    # Allow HTML in the google_maps_link column
+    # Allow HTML in the google_maps_url column
     can_view_details = True
     column_display_pk = True
 
@@ -122,6 +143,191 @@ admin.add_view(PropertyImageView(PropertyImage, db.session))
 admin.add_view(MetroStationView(MetroStation, db.session))
 admin.add_view(PropertyPreferenceView(PropertyPreference, db.session))
 
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """Count the SQL statements each request runs"""
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+@app.after_request
+def _report_query_count(response):
+    query_count = g.get('query_count', 0)
+    response.headers['X-Query-Count'] = str(query_count)
+    if query_count > QUERY_BUDGET:
+        app.logger.warning(
+            f"{request.method} {request.full_path} ran {query_count} queries (budget {QUERY_BUDGET})"
+        )
+    return response
+
+def with_list_relationships(query):
+    """Eager-load what list views render for each property (query must already join Run)"""
+    return query.options(
+        contains_eager(Property.run),
+        selectinload(Property.images),
+        selectinload(Property.metro_stations)
+    )
+
+# Bumped once a transaction writing anything list pages show through the ORM (preferences,
+# admin edits) commits, so cached pages show the new state but never one that was rolled back.
+# The boot id keeps ETags from before a restart from matching once the counter starts over.
+_write_version = 0
+_write_version_lock = threading.Lock()
+_boot_id = uuid.uuid4().hex[:8]
+VERSIONED_MODELS = (PropertyPreference, Property, PropertyImage, MetroStation, Run)
+
+@event.listens_for(OrmSession, 'after_flush')
+def _note_versioned_changes(session, flush_context):
+    # new/dirty/deleted still hold what was just flushed at this point
+    if any(isinstance(obj, VERSIONED_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['versioned_changes'] = True
+
+@event.listens_for(OrmSession, 'after_commit')
+def _bump_write_version(session):
+    global _write_version
+    if session.info.pop('versioned_changes', False):
+        with _write_version_lock:
+            _write_version += 1
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _forget_versioned_changes(session):
+    session.info.pop('versioned_changes', None)
+
+def data_version():
+    """Identifies the data list pages are rendered from.
+
+    Changes whenever the scraper writes: new listings, price changes,
+    listings moved into the latest run and that run's status, as well as
+    on any committed ORM write to the list models in this process, such
+    as preference changes and admin edits. Computed once per request.
+    """
+    if has_request_context() and 'data_version' in g:
+        return g.data_version
+
+    latest_run_id = select(Run.id).order_by(Run.id.desc()).limit(1).scalar_subquery()
+    parts = db.session.execute(select(
+        latest_run_id,
+        select(Run.status).where(Run.id == latest_run_id).scalar_subquery(),
+        select(func.count()).select_from(Property).where(Property.run_id == latest_run_id).scalar_subquery(),
+        select(func.max(Property.id)).scalar_subquery(),
+        select(func.max(PropertyPriceHistory.id)).scalar_subquery()
+    )).one()
+    version = '.'.join(str(part or 0) for part in parts) + f".{_boot_id}.{_write_version}"
+
+    if has_request_context():
+        g.data_version = version
+    return version
+
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def cached_response(view):
+    """Serve a GET view from memory while the data version and query parameters are unchanged.
+
+    Responses carry an ETag derived from the same key, so clients that
+    send it back in If-None-Match get a 304 without a body.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), data_version())
+        etag = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).hexdigest()
+
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            with _response_cache_lock:
+                cached = _response_cache.get(key)
+                if cached is not None:
+                    _response_cache.move_to_end(key)
+
+            if cached is not None:
+                body, mimetype = cached
+                response = make_response(body)
+                response.mimetype = mimetype
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                with _response_cache_lock:
+                    _response_cache[key] = (response.get_data(), response.mimetype)
+                    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                        _response_cache.popitem(last=False)
+
+        response.set_etag(etag)
+        # Let browsers keep the page but revalidate it with If-None-Match every time
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+def cached_count(key, query):
+    """Total rows for a list query, recounted when the data version changes or COUNT_CACHE_TTL seconds pass"""
+    now = time.monotonic()
+    version = data_version()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached is not None and cached[2] == version and now - cached[1] < COUNT_CACHE_TTL:
+        return cached[0]
+
+    count = query.order_by(None).count()
+    with _count_cache_lock:
+        _count_cache[key] = (count, now, version)
+    return count
+
+def paginate_newest_first(query, cursor, per_page):
+    """Keyset-paginate a Property query joined to Run, newest run first.
+
+    Rows are ordered by (runs.started_at, properties.id) descending. The
+    opaque cursors encode the boundary row and a direction, so every page
+    costs the same however deep it is. Returns (properties, next_cursor,
+    prev_cursor); a malformed cursor starts from the first page.
+    """
+    key = tuple_(Run.started_at, Property.id)
+    values = decode_cursor(cursor) if cursor else None
+    boundary = None
+    backwards = False
+    if values is not None and len(values) == 3 and values[2] in ('next', 'prev'):
+        try:
+            boundary_ts = datetime.fromisoformat(values[0])
+            boundary = tuple_(boundary_ts, int(values[1]))
+            backwards = values[2] == 'prev'
+        except (TypeError, ValueError, OverflowError):
+            boundary = None
+
+    if boundary is None:
+        properties = query.order_by(Run.started_at.desc(), Property.id.desc()).limit(per_page + 1).all()
+        has_more_after, has_more_before = len(properties) > per_page, False
+        properties = properties[:per_page]
+    elif backwards:
+        properties = (
+            # The row comparison spans two tables; the redundant single-column bound lets ix_runs_started_at narrow it
+            query.filter(Run.started_at >= boundary_ts, key > boundary)
+            .order_by(Run.started_at.asc(), Property.id.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_more_after, has_more_before = True, len(properties) > per_page
+        properties = list(reversed(properties[:per_page]))
+    else:
+        properties = (
+            query.filter(Run.started_at <= boundary_ts, key < boundary)
+            .order_by(Run.started_at.desc(), Property.id.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_more_after, has_more_before = len(properties) > per_page, True
+        properties = properties[:per_page]
+
+    next_cursor = prev_cursor = None
+    if properties:
+        first, last = properties[0], properties[-1]
+        if has_more_after:
+            next_cursor = encode_cursor([last.run.started_at.isoformat(), last.id, 'next'])
+        if has_more_before:
+            prev_cursor = encode_cursor([first.run.started_at.isoformat(), first.id, 'prev'])
+    return properties, next_cursor, prev_cursor
+
 @app.route('/status')
 def status():
     latest_run = Run.query.order_by(Run.started_at.desc()).first()
@@ -137,6 +343,8 @@ def status():
         message = f"In progress - started {started_minutes_ago} minutes ago"
     elif latest_run.status == 'failed':
         message = f"Failed - {latest_run.error_message}"
+    elif latest_run.status == 'orphaned':
+        message = f"Interrupted - {latest_run.error_message}"
     else:  # completed
         if latest_run.next_run_at:
             next_run_str = latest_run.next_run_at.strftime('%Y-%m-%d %H:%M:%S')
@@ -151,22 +359,19 @@ def status():
     })
 
 @app.route('/api/properties')
+@cached_response
 def get_properties():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 100
     
     # Get paginated properties
-    query = (
-        db.session.query(Property)
-        .join(Run)
-        .order_by(Run.started_at.desc())
-    )
+    query = db.session.query(Property).join(Run)
     
-    # Get total count
-    total_count = query.count()
+    # Get total count (cached, it only changes when a run saves new listings)
+    total_count = cached_count('all', query)
     
     # Apply pagination
-    properties = query.offset((page - 1) * per_page).limit(per_page).all()
+    properties, next_cursor, prev_cursor = paginate_newest_first(with_list_relationships(query), cursor, per_page)
     
     # Get preferences for these properties
     property_urls = [p.original_url for p in properties]
@@ -192,7 +397,9 @@ def get_properties():
             'total_floors': prop.total_floors,
             'furnished': prop.furnished,
             'has_gym': prop.has_gym,
-            'google_maps_link': prop.google_maps_link,
+            'google_maps_link': prop.google_maps_url,
+            'latitude': prop.latitude,
+            'longitude': prop.longitude,
             'created_at': prop.run.started_at.strftime('%Y-%m-%d %H:%M'),
             'images': [{'url': img.image_url} for img in prop.images],
             'metro_stations': [
@@ -208,15 +415,225 @@ def get_properties():
     return jsonify({
         'properties': properties_data,
         'total': total_count,
-        'page': page,
         'per_page': per_page,
-        'total_pages': (total_count + per_page - 1) // per_page
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    })
+
+@app.route('/api/properties/near')
+def get_properties_near():
+    """Properties within radius_m meters of (lat, lng), nearest first.
+
+    The geohash prefixes covering the circle narrow the scan through the
+    geohash index, then the exact haversine distance filters and orders the
+    rows. Pages are keyset-paginated on (distance, id) via an opaque cursor.
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius_m = request.args.get('radius_m', 1500, type=float)
+    max_metro_minutes = request.args.get('max_metro_minutes', type=int)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    cursor = request.args.get('cursor')
+
+    if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        return jsonify({'success': False, 'error': 'lat and lng are required'}), 400
+    # NaN fails every comparison, so this also rejects it along with infinities
+    if not 0 < radius_m <= MAX_NEAR_RADIUS_M:
+        return jsonify({
+            'success': False,
+            'error': f'radius_m must be positive and at most {MAX_NEAR_RADIUS_M:g}'
+        }), 400
+
+    after = decode_cursor(cursor) if cursor else None
+    if cursor:
+        try:
+            after_distance, after_id = float(after[0]), int(after[1])
+            if len(after) != 2 or not math.isfinite(after_distance):
+                raise ValueError(cursor)
+        except (TypeError, ValueError, OverflowError, IndexError, KeyError):
+            return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+    distance = distance_expression(Property.latitude, Property.longitude, lat, lng).label('distance')
+    candidates = db.session.query(Property.id.label('id'), distance).filter(
+        Property.latitude.isnot(None),
+        Property.longitude.isnot(None)
+    )
+    cells = covering_cells(lat, lng, radius_m)
+    if cells is not None:
+        candidates = candidates.filter(within_cells(Property.geohash, cells))
+    if max_metro_minutes is not None:
+        candidates = candidates.filter(
+            Property.metro_stations.any(MetroStation.walking_minutes <= max_metro_minutes)
+        )
+    candidates = candidates.subquery()
+
+    query = (
+        db.session.query(Property, candidates.c.distance)
+        .join(candidates, Property.id == candidates.c.id)
+        .filter(candidates.c.distance <= radius_m)
+        .options(selectinload(Property.metro_stations))
+    )
+    if after is not None:
+        query = query.filter(or_(
+            candidates.c.distance > after_distance,
+            and_(candidates.c.distance == after_distance, candidates.c.id > after_id)
+        ))
+    rows = query.order_by(candidates.c.distance, candidates.c.id).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last_prop, last_distance = rows[-1]
+        next_cursor = encode_cursor([last_distance, last_prop.id])
+
+    properties_data = []
+    for prop, prop_distance in rows:
+        nearest_metro = min(prop.metro_stations, key=lambda station: station.walking_minutes, default=None)
+        properties_data.append({
+            'url': prop.original_url,
+            'title': prop.title,
+            'location': prop.location,
+            'price': prop.price,
+            'total_price': prop.total_price,
+            'total_area': prop.total_area,
+            'latitude': prop.latitude,
+            'longitude': prop.longitude,
+            'distance_m': round(prop_distance),
+            'nearest_metro': {
+                'name': nearest_metro.name,
+                'walking_minutes': nearest_metro.walking_minutes
+            } if nearest_metro else None
+        })
+
+    return jsonify({
+        'properties': properties_data,
+        'next_cursor': next_cursor
     })
 
+EXPORT_COLUMNS = [
+    'id', 'url', 'title', 'location', 'price', 'common_costs', 'total_price', 'total_area',
+    'floor', 'total_floors', 'furnished', 'has_gym', 'latitude', 'longitude', 'created_at',
+    'images', 'metro_stations'
+]
+
+def export_statement():
+    """Every property with its images and metro stations aggregated in SQL, oldest first"""
+    images = (
+        select(func.json_agg(aggregate_order_by(PropertyImage.image_url, PropertyImage.id)))
+        .where(PropertyImage.property_id == Property.id)
+        .scalar_subquery()
+    )
+    metro_stations = (
+        select(func.json_agg(aggregate_order_by(
+            func.json_build_object(
+                literal_column("'name'"), MetroStation.name,
+                literal_column("'walking_minutes'"), MetroStation.walking_minutes,
+                literal_column("'distance_meters'"), MetroStation.distance_meters
+            ),
+            MetroStation.walking_minutes
+        )))
+        .where(MetroStation.property_id == Property.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Property.id,
+            Property.original_url.label('url'),
+            Property.title,
+            Property.location,
+            Property.price,
+            Property.common_costs,
+            Property.total_price,
+            Property.total_area,
+            Property.floor,
+            Property.total_floors,
+            Property.furnished,
+            Property.has_gym,
+            Property.latitude,
+            Property.longitude,
+            Run.started_at.label('created_at'),
+            func.coalesce(images, func.json_build_array()).label('images'),
+            func.coalesce(metro_stations, func.json_build_array()).label('metro_stations')
+        )
+        .outerjoin(Run, Property.run_id == Run.id)
+        .order_by(Property.id)
+    )
+
+def _export_record(row):
+    record = dict(row._mapping)
+    if record['created_at'] is not None:
+        record['created_at'] = record['created_at'].strftime('%Y-%m-%d %H:%M')
+    return record
+
+@app.route('/api/properties/export')
+def export_properties():
+    """Stream every property as NDJSON (default) or CSV (?format=csv).
+
+    Rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE and
+    are written out as they arrive, so memory stays flat however large the
+    table is. The body is gzipped when the client accepts it.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+
+    use_gzip = request.accept_encodings['gzip'] > 0
+
+    def generate_text():
+        rows = db.session.execute(export_statement().execution_options(yield_per=EXPORT_BATCH_SIZE))
+        buffer = io.StringIO()
+
+        if export_format == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                record = _export_record(row)
+                record['images'] = json.dumps(record['images'])
+                record['metro_stations'] = json.dumps(record['metro_stations'])
+                writer.writerow([record[column] for column in EXPORT_COLUMNS])
+                if buffer.tell() >= 65536:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        else:
+            for row in rows:
+                buffer.write(json.dumps(_export_record(row), ensure_ascii=False))
+                buffer.write('\n')
+                if buffer.tell() >= 65536:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def generate():
+        if not use_gzip:
+            for chunk in generate_text():
+                yield chunk.encode('utf-8')
+            return
+
+        # wbits=16+MAX_WBITS writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in generate_text():
+            compressed = compressor.compress(chunk.encode('utf-8'))
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=properties.{export_format}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
 @app.route('/')
+@cached_response
 def index():
     run_id = request.args.get('run_id')
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 100
     
     # Get filter parameters
@@ -224,12 +641,8 @@ def index():
     hide_disliked = request.args.get('hide_disliked') == 'true'
     hide_unseen = request.args.get('hide_unseen') == 'true'
     
-    # Get all properties across all runs, ordered by newest first
-    query = (
-        db.session.query(Property)
-        .join(Run)
-        .order_by(Run.started_at.desc())
-    )
+    # Get all properties across all runs (paginated newest first below)
+    query = db.session.query(Property).join(Run)
     
     # Apply filters to the query
     if hide_liked or hide_disliked or hide_unseen:
@@ -273,16 +686,11 @@ def index():
             # Show liked and disliked
             query = query.filter(preferences_subq.c.property_url != None)
     
-    # Get total count for pagination
-    total_count = query.count()
-    total_pages = (total_count + per_page - 1) // per_page
-    
-    # Ensure current page is valid
-    if page > total_pages:
-        page = total_pages if total_pages > 0 else 1
+    # Get total count (cached per filter combination)
+    total_count = cached_count(('index', hide_liked, hide_disliked, hide_unseen), query)
     
     # Apply pagination
-    properties = query.offset((page - 1) * per_page).limit(per_page).all()
+    properties, next_cursor, prev_cursor = paginate_newest_first(with_list_relationships(query), cursor, per_page)
     
     # Get preferences for these properties
     property_urls = [p.original_url for p in properties]
@@ -308,8 +716,8 @@ def index():
         'index.html',
         properties_by_location=properties_by_location,
         total_properties=total_count,
-        current_page=page,
-        total_pages=total_pages,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
         hide_liked=hide_liked,
         hide_disliked=hide_disliked,
         hide_unseen=hide_unseen
@@ -354,10 +762,5 @@ def format_number(value):
     """Format number with thousands separator"""
     return "{:,.0f}".format(value) if value else ""
 
-@app.template_filter('convert_to_embed')
-def convert_to_embed_filter(url):
-    """Template filter to convert Google Maps URL to embed URL"""
-    return convert_to_embed_src(url)
-
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3000) 
\ No newline at end of file
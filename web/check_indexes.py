@@ -0,0 +1,98 @@
+import json
+import sys
+
+from datetime import datetime
+
+from sqlalchemy import text, tuple_
+
+from web.app import app, db
+from web.models import Run, Property, PropertyImage, MetroStation, PropertyPriceHistory
+
+
+def key_queries():
+    """(description, query, expected index names) for each hot path"""
+    sample_ids = [1, 2, 3]
+    boundary_ts = datetime(2024, 1, 1)
+    return [
+        (
+            "newest-first list page",
+            db.session.query(Property).join(Run)
+            .order_by(Run.started_at.desc(), Property.id.desc())
+            .limit(101),
+            {'ix_properties_run_id_id'}
+        ),
+        (
+            "newest-first list page after a cursor",
+            db.session.query(Property).join(Run)
+            .filter(Run.started_at <= boundary_ts, tuple_(Run.started_at, Property.id) < tuple_(boundary_ts, 1000))
+            .order_by(Run.started_at.desc(), Property.id.desc())
+            .limit(101),
+            {'ix_runs_started_at', 'ix_properties_run_id_id'}
+        ),
+        (
+            "images for a page of properties",
+            db.session.query(PropertyImage).filter(PropertyImage.property_id.in_(sample_ids)),
+            {'ix_property_images_property_id'}
+        ),
+        (
+            "metro stations for a page of properties",
+            db.session.query(MetroStation).filter(MetroStation.property_id.in_(sample_ids)),
+            {'ix_metro_stations_property_id'}
+        ),
+        (
+            "price history of a property",
+            db.session.query(PropertyPriceHistory).filter(PropertyPriceHistory.property_id == 1),
+            {'ix_property_price_history_property_id'}
+        ),
+        (
+            "listing URL lookup",
+            db.session.query(Property.id).filter(Property.original_url == 'https://example.com/listing'),
+            {'properties_original_url_key'}
+        ),
+        (
+            "geohash prefix search",
+            db.session.query(Property.id).filter(Property.geohash.like('66jc%')),
+            {'ix_properties_geohash'}
+        ),
+    ]
+
+def plan_indexes(plan):
+    """Every index name used anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    indexes = set()
+    if 'Index Name' in plan:
+        indexes.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        indexes |= plan_indexes(child)
+    return indexes
+
+def explain(conn, query):
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]['Plan']
+
+def check_indexes():
+    """Print a line per key query and return True if all of them use their indexes.
+
+    Sequential scans are disabled while explaining so the result doesn't
+    depend on how much data the database currently holds.
+    """
+    ok = True
+    with db.engine.connect() as conn:
+        with conn.begin():
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for description, query, expected in key_queries():
+                used = plan_indexes(explain(conn, query))
+                missing = expected - used
+                if missing:
+                    ok = False
+                    print(f"FAIL {description}: expected {', '.join(sorted(missing))}, "
+                          f"plan used {', '.join(sorted(used)) or 'no index'}")
+                else:
+                    print(f"ok   {description}: {', '.join(sorted(used))}")
+    return ok
+
+if __name__ == "__main__":
+    with app.app_context():
+        sys.exit(0 if check_indexes() else 1)
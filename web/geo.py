@@ -0,0 +1,80 @@
+import math
+
+from sqlalchemy import func, or_
+
+EARTH_RADIUS_M = 6371000
+GEOHASH_PRECISION = 9  # Stored precision, roughly 5m x 5m cells
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a point as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+def geohash_cell_size(precision):
+    """Height and width of a geohash cell in degrees as (lat, lng)"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+def covering_cells(latitude, longitude, radius_m):
+    """Geohash prefixes of the cell containing the point and its 8 neighbours.
+
+    The precision is the finest whose cells are at least ``radius_m`` across,
+    so the 3x3 block always covers the whole circle. Returns None when the
+    radius is too large for any prefix to narrow the search.
+    """
+    meters_per_degree = math.pi * EARTH_RADIUS_M / 180
+    lng_scale = max(math.cos(math.radians(latitude)), 1e-6)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_size, lng_size = geohash_cell_size(precision)
+        if lat_size * meters_per_degree >= radius_m and lng_size * meters_per_degree * lng_scale >= radius_m:
+            break
+    else:
+        return None
+
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            neighbour_lat = latitude + lat_step * lat_size
+            if not -90 <= neighbour_lat <= 90:
+                continue
+            neighbour_lng = (longitude + lng_step * lng_size + 180) % 360 - 180
+            cells.add(geohash_encode(neighbour_lat, neighbour_lng, precision))
+    return sorted(cells)
+
+def distance_expression(lat_column, lng_column, latitude, longitude):
+    """SQL expression for the haversine distance in meters from a point to each row"""
+    a = (func.power(func.sin(func.radians(lat_column - latitude) / 2), 2)
+         + math.cos(math.radians(latitude)) * func.cos(func.radians(lat_column))
+         * func.power(func.sin(func.radians(lng_column - longitude) / 2), 2))
+    # least() guards asin against rounding just above 1
+    return 2 * EARTH_RADIUS_M * func.asin(func.sqrt(func.least(a, 1.0)))
+
+def within_cells(geohash_column, cells):
+    """Filter rows to the given geohash prefixes (uses the text_pattern_ops index)"""
+    return or_(*(geohash_column.like(f"{cell}%") for cell in cells))
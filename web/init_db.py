@@ -1,9 +1,49 @@
+from sqlalchemy import update, bindparam
+
 from web.app import app, db
+from web.models import Property
+from web.geo import geohash_encode
+from web.migrate import apply_migrations
+
+def backfill_geohashes(batch_size=1000):
+    """Compute the geohash of properties that have coordinates but no geohash yet"""
+    table = Property.__table__
+    stmt = update(table).where(table.c.id == bindparam('b_id')).values(geohash=bindparam('b_geohash'))
+    updated = 0
+
+    while True:
+        rows = (
+            db.session.query(Property.id, Property.latitude, Property.longitude)
+            .filter(
+                Property.geohash.is_(None),
+                Property.latitude.isnot(None),
+                Property.longitude.isnot(None)
+            )
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        db.session.execute(stmt, [
+            {'b_id': prop_id, 'b_geohash': geohash_encode(latitude, longitude)}
+            for prop_id, latitude, longitude in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+
+    return updated
 
 def init_db():
     with app.app_context():
         db.create_all()
         print("Database tables created successfully!")
 
+        apply_migrations()
+
+        updated = backfill_geohashes()
+        if updated:
+            print(f"Backfilled geohashes for {updated} properties")
+
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db()
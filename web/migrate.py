@@ -0,0 +1,75 @@
+import os
+import re
+
+from sqlalchemy import text
+
+from web.app import app, db
+
+MIGRATIONS_DIR = os.getenv(
+    'MIGRATIONS_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+)
+MIGRATION_FILE = re.compile(r'^(\d+)_.+\.sql$')
+
+# Arbitrary key so concurrent starts don't apply the same migration twice
+MIGRATION_LOCK_ID = 72541003
+
+def pending_migrations(applied, directory=MIGRATIONS_DIR):
+    """Numbered migration files not yet in ``applied``, as (version, filename) in order"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match and int(match.group(1)) not in applied:
+            migrations.append((int(match.group(1)), filename))
+    return sorted(migrations)
+
+def apply_migrations(directory=MIGRATIONS_DIR):
+    """Apply pending numbered migrations in order, each in its own transaction.
+
+    Applied versions are recorded in schema_migrations. Tables are created
+    from the models first, so every migration must be idempotent.
+    Returns the filenames that were applied.
+    """
+    if not os.path.isdir(directory):
+        print(f"No migrations directory at {directory}, skipping migrations")
+        return []
+
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """))
+
+    applied_files = []
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {'id': MIGRATION_LOCK_ID})
+        conn.commit()
+        try:
+            applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+            conn.commit()
+
+            for version, filename in pending_migrations(applied, directory):
+                with open(os.path.join(directory, filename)) as f:
+                    sql = f.read()
+
+                with conn.begin():
+                    # Run the file through the driver as-is so '%' and multiple statements need no escaping
+                    conn.connection.driver_connection.cursor().execute(sql)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                        {'version': version, 'name': filename}
+                    )
+                print(f"Applied migration {filename}")
+                applied_files.append(filename)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': MIGRATION_LOCK_ID})
+            conn.commit()
+
+    return applied_files
+
+if __name__ == "__main__":
+    with app.app_context():
+        apply_migrations()
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from web.utils import google_maps_url, map_embed_url
 
 db = SQLAlchemy()
 
@@ -7,10 +8,10 @@ class Run(db.Model):
     __tablename__ = 'runs'
     
     id = db.Column(db.Integer, primary_key=True)
-    started_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, index=True)
     completed_at = db.Column(db.DateTime)
     next_run_at = db.Column(db.DateTime)
-    status = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # 'running', 'completed', 'failed', 'orphaned'
     total_properties = db.Column(db.Integer)
     error_message = db.Column(db.Text)
     
@@ -19,8 +20,27 @@ class Run(db.Model):
     def __str__(self):
         return f"Run {self.id} ({self.started_at})"
 
+class RunCheckpoint(db.Model):
+    __tablename__ = 'run_checkpoints'
+
+    run_id = db.Column(db.Integer, db.ForeignKey('runs.id'), primary_key=True)
+    location_index = db.Column(db.Integer, nullable=False, default=0)
+    page = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.JSON)  # Listings scheduled for detail extraction but not saved yet
+    saved = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"Checkpoint for Run {self.run_id} (location {self.location_index}, page {self.page})"
+
 class Property(db.Model):
     __tablename__ = 'properties'
+    __table_args__ = (
+        # text_pattern_ops lets prefix LIKE queries on the geohash use the index
+        db.Index('ix_properties_geohash', 'geohash', postgresql_ops={'geohash': 'text_pattern_ops'}),
+        # Walks each run's properties in id order for the newest-first list pages
+        db.Index('ix_properties_run_id_id', 'run_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     run_id = db.Column(db.Integer, db.ForeignKey('runs.id'))
@@ -34,12 +54,25 @@ class Property(db.Model):
     total_floors = db.Column(db.Integer)
     furnished = db.Column(db.Boolean)
     has_gym = db.Column(db.Boolean)
-    original_url = db.Column(db.Text, nullable=False)
-    google_maps_link = db.Column(db.Text)
+    original_url = db.Column(db.Text, nullable=False, unique=True)
+    google_maps_link = db.Column(db.Text)  # Legacy; no longer written, superseded by latitude/longitude
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))  # Computed from latitude/longitude at save time
+    card_hash = db.Column(db.BigInteger)  # Hash of the search card's title, currency and price
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     images = db.relationship('PropertyImage', backref='property', lazy=True)
     metro_stations = db.relationship('MetroStation', backref='property', lazy=True)
+    price_history = db.relationship('PropertyPriceHistory', backref='property', lazy=True)
+
+    @property
+    def google_maps_url(self):
+        return google_maps_url(self.latitude, self.longitude)
+
+    @property
+    def map_embed_url(self):
+        return map_embed_url(self.latitude, self.longitude)
 
     def __str__(self):
         return self.title
@@ -48,7 +81,7 @@ class PropertyImage(db.Model):
     __tablename__ = 'property_images'
     
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'))
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), index=True)
     image_url = db.Column(db.Text, nullable=False)
 
     def __str__(self):
@@ -58,7 +91,7 @@ class MetroStation(db.Model):
     __tablename__ = 'metro_stations'
     
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'))
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), index=True)
     name = db.Column(db.String(100), nullable=False)
     walking_minutes = db.Column(db.Integer, nullable=False)
     distance_meters = db.Column(db.Integer, nullable=False)
@@ -66,10 +99,33 @@ class MetroStation(db.Model):
     def __str__(self):
         return f"{self.name} ({self.walking_minutes} min)" 
 
+class PropertyPriceHistory(db.Model):
+    __tablename__ = 'property_price_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False, index=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('runs.id'))
+    price = db.Column(db.Integer)
+    currency = db.Column(db.String(5))
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"{self.price} for Property {self.property_id} ({self.recorded_at})"
+
 class PropertyPreference(db.Model):
     __tablename__ = 'property_preferences'
     
     id = db.Column(db.Integer, primary_key=True)
     property_url = db.Column(db.Text, nullable=False, unique=True)
     status = db.Column(db.String(10), nullable=False)  # 'liked', 'disliked'
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) 
\ No newline at end of file
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) 
+
+class UFRate(db.Model):
+    __tablename__ = 'uf_rates'
+
+    date = db.Column(db.Date, primary_key=True)
+    value = db.Column(db.Float, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __str__(self):
+        return f"UF {self.value} ({self.date})"
@@ -1,28 +1,27 @@
-from urllib.parse import urlencode, urlparse, parse_qs
+import base64
+import json
 
-def convert_to_embed_src(url):
-    """Convert Google Maps URL to embed URL"""
-    if not url:
+def google_maps_url(latitude, longitude):
+    """Google Maps link for a point"""
+    if latitude is None or longitude is None:
         return None
-        
+    return f"https://www.google.com/maps?q={latitude},{longitude}"
+
+def map_embed_url(latitude, longitude):
+    """Google Maps embed URL for a point"""
+    if latitude is None or longitude is None:
+        return None
+    return f"https://www.google.com/maps?q={latitude},{longitude}&z=12&output=embed"
+
+def encode_cursor(values):
+    """Opaque pagination cursor for a list of keyset values"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Keyset values from a cursor made by encode_cursor, or None if it is malformed"""
     try:
-        # Parse the input URL
-        parsed_url = urlparse(url)
-        
-        # Try to get coordinates from query parameters
-        query_params = parse_qs(parsed_url.query)
-        if 'll' in query_params:
-            coords = query_params['ll'][0]
-            return f"https://www.google.com/maps?q={coords}&z=12&output=embed"
-            
-        # Fallback to path parsing if needed
-        path_parts = parsed_url.path.split('@')
-        if len(path_parts) > 1:
-            coords = ','.join(path_parts[1].split(',')[:2])  # Just get lat,lng
-            return f"https://www.google.com/maps?q={coords}&z=12&output=embed"
-            
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
         return None
-        
-    except Exception as e:
-        print(f"Error converting map URL: {str(e)}")
-        return None 
\ No newline at end of file
+    return values if isinstance(values, list) else None